@@ -1,43 +1,748 @@
 import sys
 import os as os
 from PySide2 import QtCore, QtGui, QtWidgets
+import abc
+import bisect
+import hashlib
 import json
-import shutil
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+
+class PixmapCache(object):
+    '''
+    LRU cache of pixmaps bounded by memory, least recently used pixmaps are dropped first
+    '''
+    def __init__(self, limit_bytes):
+        self.limit_bytes = limit_bytes
+        self.size_bytes = 0
+        self.pixmaps = OrderedDict()
+
+    def get(self, key):
+        ''' Returns cached pixmap or None, marks it as recently used '''
+        pixmap = self.pixmaps.pop(key, None)
+        if pixmap is not None:
+            self.pixmaps[key] = pixmap
+        return pixmap
+
+    def insert(self, key, pixmap):
+        self.remove(key)
+        self.pixmaps[key] = pixmap
+        self.size_bytes += self.get_cost(pixmap)
+
+        while self.size_bytes > self.limit_bytes and len(self.pixmaps) > 1:
+            _, oldest = self.pixmaps.popitem(last=False)
+            self.size_bytes -= self.get_cost(oldest)
+
+    def remove(self, key):
+        pixmap = self.pixmaps.pop(key, None)
+        if pixmap is not None:
+            self.size_bytes -= self.get_cost(pixmap)
+
+    def get_cost(self, pixmap):
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+class ThumbnailDiskCache(object):
+    '''
+    Pre-scaled previews stored on disk, so next start does not decode original images again
+    Key is made of image path, mtime, file size and preview size - changed image never gets stale preview
+    Least recently used files are evicted once size limit is reached
+    Used from thread pool, all methods are thread safe
+    '''
+    FORMAT = 'jpg' # small files, scaled decoding of preview is cheap
+    QUALITY = 90
+
+    def __init__(self, cache_dir, limit_bytes):
+        self.cache_dir = cache_dir
+        self.limit_bytes = limit_bytes
+        self.size_bytes = None # computed on first store
+        self.lock = threading.Lock()
+
+    def get_cache_path(self, image_path, size):
+        ''' Raises OSError if image does not exist '''
+        stat = os.stat(image_path)
+        key = "{}|{!r}|{}|{}x{}".format(os.path.abspath(image_path), stat.st_mtime, stat.st_size, size.width(), size.height())
+        return os.path.join(self.cache_dir, "{}.{}".format(hashlib.sha1(key.encode('utf-8')).hexdigest(), self.FORMAT))
+
+    def load(self, image_path, size):
+        ''' Returns cached QImage or None '''
+        try:
+            cache_path = self.get_cache_path(image_path, size)
+            image = QtGui.QImage(cache_path)
+            if image.isNull():
+                return None
+            os.utime(cache_path, None) # mark as recently used for eviction
+            return image
+        except OSError:
+            return None
+
+    def store(self, image_path, size, image):
+        try:
+            cache_path = self.get_cache_path(image_path, size)
+        except OSError:
+            return
+
+        with self.lock:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            if self.size_bytes is None:
+                self.size_bytes = sum(os.path.getsize(path) for path in self.get_cache_files())
+
+        # written under temporary name, other threads never read half written file
+        temp_path = "{}.{}.tmp".format(cache_path, threading.current_thread().ident)
+        try:
+            if not image.save(temp_path, self.FORMAT, self.QUALITY):
+                return
+
+            with self.lock:
+                if os.path.exists(cache_path): # stored meanwhile by another thread
+                    return
+                os.rename(temp_path, cache_path)
+                self.size_bytes += os.path.getsize(cache_path)
+                if self.size_bytes > self.limit_bytes:
+                    self.evict()
+        except OSError: # disk full, cache dir removed, ... preview is decoded again next time
+            pass
+        finally:
+            if os.path.exists(temp_path): # failed or unneeded write, nothing else ever removes it
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def evict(self):
+        ''' Removes least recently used thumbnails until cache is under 90% of its limit, caller holds lock '''
+        files = sorted(self.get_cache_files(), key=os.path.getmtime)
+        target_bytes = self.limit_bytes * 0.9
+        for path in files:
+            if self.size_bytes <= target_bytes:
+                break
+            try:
+                file_size = os.path.getsize(path)
+                os.remove(path)
+                self.size_bytes -= file_size
+            except OSError: # already removed
+                pass
+
+    def get_cache_files(self):
+        suffix = ".{}".format(self.FORMAT)
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(suffix)]
+
+
+class ThumbnailTaskSignals(QtCore.QObject):
+    ''' Owned by task, so task could still emit when loader was already deleted '''
+    image_decoded = QtCore.Signal(str, QtGui.QImage) # emitted from worker thread
+
+
+class ThumbnailTask(QtCore.QRunnable):
+    '''
+    Decodes image already downscaled to requested size, runs in thread pool
+    QImage could be used outside GUI thread, QPixmap is created by ThumbnailLoader
+    '''
+    def __init__(self, image_path, size, disk_cache=None):
+        super(ThumbnailTask, self).__init__()
+        self.signals = ThumbnailTaskSignals()
+        self.image_path = image_path
+        self.size = size
+        self.disk_cache = disk_cache
+
+    def run(self):
+        image = self.disk_cache.load(self.image_path, self.size) if self.disk_cache else None
+        if image is None:
+            image = self.read_scaled_image()
+            if self.disk_cache and not image.isNull():
+                self.disk_cache.store(self.image_path, self.size, image)
+
+        self.signals.image_decoded.emit(self.image_path, image) # queued to GUI thread
+
+    def read_scaled_image(self):
+        reader = QtGui.QImageReader(self.image_path)
+        image_size = reader.size()
+        if image_size.isValid():
+            # decoder scales while reading (eg. DCT scaling for jpg), full size image is never in memory
+            reader.setScaledSize(image_size.scaled(self.size, QtCore.Qt.KeepAspectRatio))
+        return reader.read() # null image if file could not be read
+
+
+class ThumbnailLoader(QtCore.QObject):
+    '''
+    Loads downscaled previews on thread pool, keeps them in memory bounded LRU cache
+    '''
+    CACHE_LIMIT_BYTES = 64 * 1024 * 1024
+
+    thumbnail_loaded = QtCore.Signal(str) # image path, pixmap is ready in cache
+
+    def __init__(self, size, disk_cache=None, parent=None):
+        super(ThumbnailLoader, self).__init__(parent)
+
+        self.size = size
+        self.disk_cache = disk_cache
+        self.cache = PixmapCache(self.CACHE_LIMIT_BYTES)
+        self.pending = {} # image path -> ThumbnailTask waiting or running in thread pool
+
+        self.thread_pool = QtCore.QThreadPool(self)
+
+    def get(self, image_path):
+        ''' Returns cached pixmap or None if it was not loaded yet '''
+        return self.cache.get(image_path)
+
+    def request(self, image_path, priority=0):
+        ''' Starts loading of image, thumbnail_loaded is emitted once pixmap is in cache '''
+        if image_path in self.pending or self.cache.get(image_path) is not None:
+            return
+
+        task = ThumbnailTask(image_path, self.size, self.disk_cache)
+        task.setAutoDelete(False) # task is referenced by pending until image is decoded
+        task.signals.image_decoded.connect(self.on_image_decoded)
+        self.pending[image_path] = task
+        self.thread_pool.start(task, priority)
+
+    def cancel_pending(self, keep_paths=()):
+        ''' Drops queued requests which are not needed anymore, eg. after user moved to another asset '''
+        for image_path, task in list(self.pending.items()):
+            if image_path not in keep_paths and self.thread_pool.tryTake(task):
+                del self.pending[image_path]
+
+    def stop(self):
+        ''' Drops queued requests and waits for running ones, called before loader could be deleted '''
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone()
+        self.pending = {}
+
+    def invalidate(self, image_path):
+        ''' Forgets pixmap of changed image, next request loads it again '''
+        self.cache.remove(image_path)
+        task = self.pending.get(image_path)
+        if task and self.thread_pool.tryTake(task):
+            del self.pending[image_path]
+
+    def on_image_decoded(self, image_path, image):
+        self.pending.pop(image_path, None)
+
+        pixmap = QtGui.QPixmap.fromImage(image) if not image.isNull() else QtGui.QPixmap()
+        self.cache.insert(image_path, pixmap)
+        self.thumbnail_loaded.emit(image_path)
+
+
+class AssetCatalog(abc.ABC):
+    '''
+    Storage of asset metadata, asset is dictionary with FIELDS identified by unique asset code
+    '''
+    FIELDS = ['name', 'description', 'creator', 'created', 'modified', 'image_path']
+
+    @abc.abstractmethod
+    def iter_assets(self):
+        ''' Yields (code, details) of all assets in catalog order '''
+
+    @abc.abstractmethod
+    def get(self, code):
+        ''' Returns details of asset or None if code is not in catalog '''
+
+    @abc.abstractmethod
+    def save(self, code, details):
+        ''' Inserts or updates single asset '''
+
+    def save_many(self, assets):
+        ''' Inserts or updates list of (code, details) '''
+        for code, details in assets:
+            self.save(code, details)
+
+    def close(self):
+        pass
+
+
+class JsonAssetCatalog(AssetCatalog):
+    '''
+    Whole catalog is parsed from one json file
+    Saved assets are appended to journal file next to it, journal is compacted into json file periodically
+    Json file is always replaced atomically, so crash could lose at most torn last line of journal
+    '''
+    JOURNAL_SUFFIX = '.journal'
+    COMPACT_AFTER = 100 # journal entries
+
+    def __init__(self, json_path):
+        self.json_path = json_path
+        self.journal_path = json_path + self.JOURNAL_SUFFIX
+        self.journal_count = 0
+
+        with open(self.json_path, 'r') as asset_file:
+            self.content = json.load(asset_file, object_pairs_hook=OrderedDict) # keeps order of assets in file
+
+        self.replay_journal()
+
+    def iter_assets(self):
+        return iter(list(self.content.items()))
+
+    def get(self, code):
+        return self.content.get(code)
+
+    def save(self, code, details):
+        ''' Appends one line to journal and flushes it to disk, whole json file is not touched '''
+        self.content[code] = details
+
+        with open(self.journal_path, 'a') as journal_file:
+            journal_file.write(json.dumps({'code': code, 'details': details}) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        self.journal_count += 1
+
+        if self.journal_count >= self.COMPACT_AFTER:
+            self.compact()
+
+    def replay_journal(self):
+        '''
+        Applies changes saved after last compaction, eg. after crash
+        Torn last line is cut off, otherwise next save would be appended after it and lost on next replay
+        '''
+        if not os.path.exists(self.journal_path):
+            return
+
+        good_offset = 0 # end of last complete entry
+        with open(self.journal_path, 'rb') as journal_file:
+            for line in journal_file:
+                if not line.endswith(b'\n'): # torn last line, it was never confirmed as saved
+                    break
+                try:
+                    entry = json.loads(line.decode('utf-8'), object_pairs_hook=OrderedDict)
+                except ValueError:
+                    break
+                self.content[entry['code']] = entry['details']
+                self.journal_count += 1
+                good_offset += len(line)
+
+        if good_offset < os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as journal_file:
+                journal_file.truncate(good_offset)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+
+    def compact(self):
+        '''
+        Writes whole catalog to temporary file and renames it over json file, then journal is dropped
+        Crash before rename keeps old json file and journal, crash after rename only replays journal again
+        '''
+        temp_path = self.json_path + '.new'
+        with open(temp_path, 'w') as asset_file:
+            json.dump(self.content, asset_file)
+            asset_file.flush()
+            os.fsync(asset_file.fileno())
+        os.replace(temp_path, self.json_path)
+
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_count = 0
+
+    def close(self):
+        if self.journal_count:
+            self.compact()
+
+
+class SqliteAssetCatalog(AssetCatalog):
+    '''
+    Every asset is one row with code as primary key, lookups are indexed
+    Saving asset updates only its row in a transaction
+    Content of json file is imported when database is created
+    Connection is opened on first use, so catalog could be used again after close
+    '''
+    CREATE_TABLE_SQL = """
+        create table if not exists assets(code text primary key, name text, description text,
+                                          creator text, created text, modified text, image_path text)
+        """
+
+    def __init__(self, db_path, json_path=None):
+        self.db_path = db_path
+        self._connection = None
+
+        with self.connection:
+            self.connection.execute(self.CREATE_TABLE_SQL)
+
+        is_empty = self.connection.execute("select count(*) from assets").fetchone()[0] == 0
+        if is_empty and json_path and os.path.exists(json_path):
+            self.import_json(json_path)
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.db_path)
+        return self._connection
+
+    def import_json(self, json_path):
+        ''' Imports all assets from json file in one transaction '''
+        with open(json_path, 'r') as asset_file:
+            content = json.load(asset_file, object_pairs_hook=OrderedDict)
+
+        rows = [[code] + [details.get(field, '') for field in self.FIELDS] for code, details in content.items()]
+        with self.connection:
+            self.connection.executemany("insert or replace into assets(code, {}) values(?, {})".format(
+                ", ".join(self.FIELDS), ", ".join("?" * len(self.FIELDS))), rows)
+
+    def iter_assets(self):
+        cursor = self.connection.execute("select code, {} from assets order by rowid".format(", ".join(self.FIELDS)))
+        for row in cursor:
+            yield row[0], dict(zip(self.FIELDS, row[1:]))
+
+    def get(self, code):
+        row = self.connection.execute("select {} from assets where code = ?".format(", ".join(self.FIELDS)), (code,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(self.FIELDS, row))
+
+    def save(self, code, details):
+        self.save_many([(code, details)])
+
+    def save_many(self, assets):
+        ''' All assets are written in one transaction '''
+        with self.connection: # commits, or rolls back on exception
+            for code, details in assets:
+                values = [details.get(field, '') for field in self.FIELDS]
+                cursor = self.connection.execute("update assets set {} where code = ?".format(
+                    ", ".join("{} = ?".format(field) for field in self.FIELDS)), values + [code])
+                if cursor.rowcount == 0: # new asset, update keeps rowid and so position in list
+                    self.connection.execute("insert into assets(code, {}) values(?, {})".format(
+                        ", ".join(self.FIELDS), ", ".join("?" * len(self.FIELDS))), [code] + values)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class DirectoryScanTask(QtCore.QRunnable):
+    '''
+    Lists image files of directory with their mtime and size, compares them with previous index
+    Runs in thread pool, previous index is not modified by watcher while scan runs
+    '''
+    def __init__(self, watcher, dir_path, extensions, mtime_index):
+        super(DirectoryScanTask, self).__init__()
+        self.watcher = watcher
+        self.dir_path = dir_path
+        self.extensions = extensions
+        self.mtime_index = mtime_index
+
+    def run(self):
+        index = {}
+        try:
+            for entry in os.scandir(self.dir_path):
+                if entry.name.lower().endswith(self.extensions) and entry.is_file():
+                    stat = entry.stat()
+                    index[entry.name] = (stat.st_mtime, stat.st_size)
+        except OSError: # directory removed or not accessible, all images are reported as removed
+            pass
+
+        added = [name for name in index if name not in self.mtime_index]
+        changed = [name for name, stamp in index.items() if name in self.mtime_index and self.mtime_index[name] != stamp]
+        removed = [name for name in self.mtime_index if name not in index]
+
+        self.watcher.scan_finished.emit(index, added, changed, removed) # queued to GUI thread
+
+
+class AssetDirectoryWatcher(QtCore.QObject):
+    '''
+    Reports added, changed and removed image files of asset directory
+    QFileSystemWatcher triggers rescan when directory content changes, bursts of changes are debounced
+    Polling catches images modified in place and works where file system notifications are not available
+    Rescan compares files with mtime index, only differences are reported
+    '''
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.exr')
+
+    DEBOUNCE_INTERVAL = 300 # ms
+    POLL_INTERVAL = 10000 # ms
+    FALLBACK_POLL_INTERVAL = 2000 # ms, used when directory could not be watched
+
+    scan_finished = QtCore.Signal(object, list, list, list) # emitted from worker thread
+    images_changed = QtCore.Signal(list, list, list) # added, changed, removed file names
+
+    def __init__(self, dir_path, parent=None):
+        super(AssetDirectoryWatcher, self).__init__(parent)
+
+        self.dir_path = dir_path
+        self.mtime_index = {} # file name -> (mtime, size)
+        self.is_scanning = False
+        self.is_rescan_requested = False
+
+        self.thread_pool = QtCore.QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+
+        self.file_system_watcher = QtCore.QFileSystemWatcher(self)
+
+        self.debounce_timer = QtCore.QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_INTERVAL)
+
+        self.poll_timer = QtCore.QTimer(self)
+
+        self.file_system_watcher.directoryChanged.connect(lambda path: self.debounce_timer.start())
+        self.debounce_timer.timeout.connect(self.rescan)
+        self.poll_timer.timeout.connect(self.rescan)
+        self.scan_finished.connect(self.on_scan_finished)
+
+    def start(self):
+        ''' First scan reports all images as added, images changed while stopped are reported on next start '''
+        if self.poll_timer.isActive(): # already running
+            return
+        is_watched = self.file_system_watcher.addPath(self.dir_path)
+        self.poll_timer.start(self.POLL_INTERVAL if is_watched else self.FALLBACK_POLL_INTERVAL)
+        self.rescan()
+
+    def stop(self):
+        self.poll_timer.stop()
+        self.debounce_timer.stop()
+        if self.file_system_watcher.directories():
+            self.file_system_watcher.removePaths(self.file_system_watcher.directories())
+
+    def rescan(self):
+        if self.is_scanning: # changes during scan are picked up by one more scan
+            self.is_rescan_requested = True
+            return
+
+        self.is_scanning = True
+        self.thread_pool.start(DirectoryScanTask(self, self.dir_path, self.IMAGE_EXTENSIONS, self.mtime_index))
+
+    def on_scan_finished(self, mtime_index, added, changed, removed):
+        self.mtime_index = mtime_index
+        self.is_scanning = False
+
+        if added or changed or removed:
+            self.images_changed.emit(added, changed, removed)
+
+        if self.is_rescan_requested:
+            self.is_rescan_requested = False
+            self.rescan()
+
+
+class AssetSearchIndex(object):
+    '''
+    Inverted index of lowercased words of asset code, name, description and creator
+    Every query word is matched as prefix of indexed words, results of all query words are intersected
+    '''
+    WORD_RE = re.compile(r"[^\W_]+", re.UNICODE) # 'bbb_chr_big_buck_bunny' is indexed as 'bbb', 'chr', 'big'...
+
+    def __init__(self):
+        self.postings = {} # word -> set of rows
+        self.words = [] # sorted words, prefix lookup by bisect
+
+    def get_words(self, texts):
+        return set(word for text in texts if text for word in self.WORD_RE.findall(text.lower()))
+
+    def add(self, row, texts):
+        for word in self.get_words(texts):
+            rows = self.postings.get(word)
+            if rows is None:
+                rows = self.postings[word] = set()
+                bisect.insort(self.words, word)
+            rows.add(row)
+
+    def remove(self, row, texts):
+        for word in self.get_words(texts):
+            self.postings.get(word, set()).discard(row) # empty words stay in index, they do not match anything
+
+    def search(self, query):
+        ''' Returns sorted list of matching rows or None if query has no words (everything matches) '''
+        query_words = sorted(self.get_words([query]), key=len, reverse=True) # longest words are the most selective
+        if not query_words:
+            return None
+
+        result = None
+        for query_word in query_words:
+            rows = self.find_prefix(query_word)
+            result = rows if result is None else result & rows
+            if not result:
+                return []
+
+        return sorted(result)
+
+    def find_prefix(self, prefix):
+        rows = set()
+        position = bisect.bisect_left(self.words, prefix)
+        while position < len(self.words) and self.words[position].startswith(prefix):
+            rows.update(self.postings[self.words[position]])
+            position += 1
+        return rows
+
+
+class AssetListModel(QtCore.QAbstractListModel):
+    '''
+    Lazy list of asset codes for virtualized grid view, view asks data only for cells it shows
+    Thumbnail of cell is requested when it is painted for the first time
+    '''
+    CODE_ROLE = QtCore.Qt.UserRole
+
+    def __init__(self, thumbnail_loader, parent=None):
+        super(AssetListModel, self).__init__(parent)
+
+        self.thumbnail_loader = thumbnail_loader
+        self.thumbnail_loader.thumbnail_loaded.connect(self.on_thumbnail_loaded)
+
+        self.placeholder = QtGui.QPixmap(self.thumbnail_loader.size)
+        self.placeholder.fill(QtCore.Qt.transparent)
+
+        self.codes = [] # all assets, row is position in catalog
+        self.image_paths = []
+        self.rows_by_code = {}
+        self.rows_by_image_path = {}
+
+        self.visible_rows = [] # sorted rows matching search, one per view row
+        self.is_filtered = False
+
+    def set_assets(self, codes, image_paths):
+        self.beginResetModel()
+        self.codes = codes
+        self.image_paths = image_paths
+        self.rows_by_code = dict((code, row) for row, code in enumerate(codes))
+        self.rows_by_image_path = {}
+        for row, image_path in enumerate(image_paths):
+            self.rows_by_image_path.setdefault(image_path, []).append(row)
+        self.visible_rows = list(range(len(codes)))
+        self.is_filtered = False
+        self.endResetModel()
+
+    def add_asset(self, code, image_path):
+        ''' Appends asset, it is shown right away unless search is active '''
+        row = len(self.codes)
+        self.codes.append(code)
+        self.image_paths.append(image_path)
+        self.rows_by_code[code] = row
+        self.rows_by_image_path.setdefault(image_path, []).append(row)
+
+        if not self.is_filtered:
+            position = len(self.visible_rows)
+            self.beginInsertRows(QtCore.QModelIndex(), position, position)
+            self.visible_rows.append(row)
+            self.endInsertRows()
+
+        return row
+
+    def set_visible_rows(self, rows):
+        ''' Shows only given rows (sorted list), None shows all assets '''
+        self.beginResetModel()
+        self.visible_rows = list(range(len(self.codes))) if rows is None else rows
+        self.is_filtered = rows is not None
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.visible_rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = self.visible_rows[index.row()]
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole, self.CODE_ROLE):
+            return self.codes[row]
+
+        if role == QtCore.Qt.DecorationRole:
+            image_path = self.image_paths[row]
+            pixmap = self.thumbnail_loader.get(image_path)
+            if pixmap is None:
+                self.thumbnail_loader.request(image_path)
+                return self.placeholder
+            return pixmap
+
+    def get_position(self, code):
+        ''' Returns view row of asset or -1 if it is filtered out '''
+        return self.get_position_of_row(self.rows_by_code.get(code, -1))
+
+    def get_position_of_row(self, row):
+        position = bisect.bisect_left(self.visible_rows, row)
+        if position < len(self.visible_rows) and self.visible_rows[position] == row:
+            return position
+        return -1
+
+    def get_image_path(self, position):
+        return self.image_paths[self.visible_rows[position]]
+
+    def on_thumbnail_loaded(self, image_path):
+        ''' Repaints only cells showing image, also used when image file changed '''
+        for row in self.rows_by_image_path.get(image_path, []):
+            position = self.get_position_of_row(row)
+            if position >= 0:
+                index = self.index(position)
+                self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+
+
 class AssetViewer(QtWidgets.QWidget):
     '''
-    Small editor that loads metadata information from json file, parses them and fills form.
-    Shows preview of an image that holds that metadata.
-    Stores updated metadata in .json file
+    Small editor that loads metadata information from asset catalog, parses them and fills form.
+    Assets are browsed in searchable thumbnail grid, shows preview of an image that holds that metadata.
+    Stores updated metadata in asset catalog
     '''
     IMAGE_WIDTH = 400
     IMAGE_HEIGHT = IMAGE_WIDTH / 1.77778
 
     ASSET_DIR_PATH = "{}/{}".format(os.getcwd(), 'assets')
     JSON_FILE_NAME = 'assets.json'
+    DB_FILE_NAME = 'assets.db'
+
+    CATALOG_BACKEND = 'sqlite' # 'sqlite' or 'json'
+
+    PREFETCH_COUNT = 2 # assets before and after current one in the list, loaded in background
+
+    GRID_ICON_SIZE = QtCore.QSize(128, 72)
+    GRID_CELL_SIZE = QtCore.QSize(140, 96) # icon + code, uniform cells let view skip measuring each asset
+
+    THUMBNAIL_CACHE_DIR_NAME = '.thumbcache'
+    THUMBNAIL_CACHE_LIMIT_BYTES = 512 * 1024 * 1024
 
     def __init__(self):
         super(AssetViewer, self).__init__(parent=None)
 
         self.setWindowTitle("AssetViewer")
-        self.setMinimumSize(400, 300)
+        self.setMinimumSize(900, 500)
+
+        self.current_image_path = None
+        disk_cache = ThumbnailDiskCache("{}/{}".format(self.ASSET_DIR_PATH, self.THUMBNAIL_CACHE_DIR_NAME),
+                                        self.THUMBNAIL_CACHE_LIMIT_BYTES)
+        self.thumbnail_loader = ThumbnailLoader(QtCore.QSize(self.IMAGE_WIDTH, int(self.IMAGE_HEIGHT)), disk_cache, self)
+        self.grid_thumbnail_loader = ThumbnailLoader(self.GRID_ICON_SIZE, disk_cache, self)
+
+        self.search_index = AssetSearchIndex()
+        self.asset_list_model = AssetListModel(self.grid_thumbnail_loader, self)
+
+        self.directory_watcher = AssetDirectoryWatcher(self.ASSET_DIR_PATH, self)
 
         self.create_widgets()
         self.create_layout()
         self.create_connections()
 
-        self.load_assets_from_json()
+        self.catalog = self.create_catalog()
+        self.load_assets()
 
         self.refresh_asset_details()
 
     def create_widgets(self):
-        self.asset_list_lbl = QtWidgets.QLabel("Asset Code:")
-        self.asset_list_cmb  = QtWidgets.QComboBox()
+        self.search_lbl = QtWidgets.QLabel("Search:")
+        self.search_le = QtWidgets.QLineEdit()
+        self.search_le.setPlaceholderText("code, name, description or creator")
+
+        self.search_timer = QtCore.QTimer(self) # search runs once user stops typing
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(100)
+
+        self.scroll_timer = QtCore.QTimer(self) # stale thumbnail requests are dropped once scrolling stops
+        self.scroll_timer.setSingleShot(True)
+        self.scroll_timer.setInterval(150)
+
+        self.asset_list_view = QtWidgets.QListView()
+        self.asset_list_view.setModel(self.asset_list_model)
+        self.asset_list_view.setViewMode(QtWidgets.QListView.IconMode)
+        self.asset_list_view.setMovement(QtWidgets.QListView.Static)
+        self.asset_list_view.setResizeMode(QtWidgets.QListView.Adjust)
+        self.asset_list_view.setUniformItemSizes(True)
+        self.asset_list_view.setLayoutMode(QtWidgets.QListView.Batched) # layout of large lists does not block
+        self.asset_list_view.setIconSize(self.GRID_ICON_SIZE)
+        self.asset_list_view.setGridSize(self.GRID_CELL_SIZE)
+        self.asset_list_view.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
 
         self.image_preview_lbl = QtWidgets.QLabel()
-        self.image_preview_lbl.setFixedHeight(self.IMAGE_WIDTH)
-        self.image_preview_lbl.setFixedHeight(self.IMAGE_HEIGHT)
+        self.image_preview_lbl.setFixedWidth(self.IMAGE_WIDTH)
+        self.image_preview_lbl.setFixedHeight(int(self.IMAGE_HEIGHT))
+        self.image_preview_lbl.setAlignment(QtCore.Qt.AlignCenter)
 
         self.name_le = QtWidgets.QLineEdit()
         self.description_ple = QtWidgets.QPlainTextEdit()
@@ -52,10 +757,9 @@ class AssetViewer(QtWidgets.QWidget):
         self.cancel_btn = QtWidgets.QPushButton("Cancel")
 
     def create_layout(self):
-        asset_list_layout = QtWidgets.QHBoxLayout()
-        asset_list_layout.addStretch()
-        asset_list_layout.addWidget(self.asset_list_lbl)
-        asset_list_layout.addWidget(self.asset_list_cmb)
+        search_layout = QtWidgets.QHBoxLayout()
+        search_layout.addWidget(self.search_lbl)
+        search_layout.addWidget(self.search_le)
 
         asset_description_layout = QtWidgets.QFormLayout()
         asset_description_layout.addRow("Name", self.name_le)
@@ -69,24 +773,44 @@ class AssetViewer(QtWidgets.QWidget):
         button_layout.addWidget(self.save_btn)
         button_layout.addWidget(self.cancel_btn)
 
+        asset_details_layout = QtWidgets.QVBoxLayout()
+        asset_details_layout.addWidget(self.image_preview_lbl)
+        asset_details_layout.addLayout(asset_description_layout)
+
+        content_layout = QtWidgets.QHBoxLayout()
+        content_layout.addWidget(self.asset_list_view, 1)
+        content_layout.addLayout(asset_details_layout)
+
         main_layout = QtWidgets.QVBoxLayout(self)
         main_layout.setContentsMargins(3,3,3,3)
-        main_layout.addLayout(asset_list_layout)
-        main_layout.addWidget(self.image_preview_lbl)
-        main_layout.addLayout(asset_description_layout)
+        main_layout.addLayout(search_layout)
+        main_layout.addLayout(content_layout)
         main_layout.addLayout(button_layout)
 
     def create_connections(self):
-        self.asset_list_cmb.currentIndexChanged.connect(self.refresh_asset_details)
+        self.asset_list_view.selectionModel().currentChanged.connect(self.refresh_asset_details)
+        self.thumbnail_loader.thumbnail_loaded.connect(self.on_thumbnail_loaded)
 
-        self.save_btn.clicked.connect(self.save_assets_to_json)
+        self.search_le.textChanged.connect(self.search_timer.start)
+        self.search_timer.timeout.connect(self.search_assets)
+
+        self.asset_list_view.verticalScrollBar().valueChanged.connect(lambda value: self.scroll_timer.start()) # start(int) would take scroll position as interval
+        self.scroll_timer.timeout.connect(self.drop_hidden_thumbnail_requests)
+
+        self.directory_watcher.images_changed.connect(self.on_images_changed)
+
+        self.save_btn.clicked.connect(self.save_asset)
 
     def refresh_asset_details(self):
         """ Updates asset information
             Sets image preview
         """
-        asset_details = self.content[self.asset_list_cmb.currentText()]
+        asset_details = self.catalog.get(self.get_current_asset_code())
+        if asset_details is None: # empty catalog or nothing found
+            return
+
         self.load_image_preview(asset_details["image_path"])
+        self.prefetch_image_previews()
 
         self.name_le.setText(asset_details["name"])
         self.description_ple.setPlainText(asset_details["description"])
@@ -94,53 +818,192 @@ class AssetViewer(QtWidgets.QWidget):
         self.created_le.setText(asset_details["created"])
         self.modified_le.setText(asset_details["modified"])
 
-    def load_assets_from_json(self):
-        """ Parse json file to produce codes in asset_list_cmb """
-        url = "{}/{}".format(self.ASSET_DIR_PATH, self.JSON_FILE_NAME)
+    def create_catalog(self):
+        """ Opens catalog of CATALOG_BACKEND type, sqlite database is filled from json file on first run """
+        json_path = "{}/{}".format(self.ASSET_DIR_PATH, self.JSON_FILE_NAME)
+        if self.CATALOG_BACKEND == 'json':
+            return JsonAssetCatalog(json_path)
+
+        return SqliteAssetCatalog("{}/{}".format(self.ASSET_DIR_PATH, self.DB_FILE_NAME), json_path)
+
+    def load_assets(self):
+        """ Fills asset list and search index from catalog in one pass """
+        codes = []
+        image_paths = []
+        for row, (code, asset_details) in enumerate(self.catalog.iter_assets()):
+            codes.append(code)
+            image_paths.append(self.get_image_url(asset_details["image_path"]))
+            self.search_index.add(row, self.get_search_texts(code, asset_details))
+
+        self.asset_list_model.set_assets(codes, image_paths)
+        self.set_current_position(0)
 
-        with open(url, 'r') as asset_file:
-            self.content = json.load(asset_file)
+    def get_search_texts(self, code, asset_details):
+        return [code, asset_details["name"], asset_details["description"], asset_details["creator"]]
 
-            for asset in self.content.keys():
-                self.asset_list_cmb.addItem(asset)
+    def search_assets(self):
+        """ Shows only assets matching search text, current asset stays selected if it matches """
+        current_code = self.get_current_asset_code()
+
+        self.asset_list_model.set_visible_rows(self.search_index.search(self.search_le.text()))
+
+        position = self.asset_list_model.get_position(current_code)
+        self.set_current_position(position if position >= 0 else 0)
+
+    def drop_hidden_thumbnail_requests(self):
+        """ Cancels queued thumbnails of cells user scrolled past, repaint requests visible ones again """
+        self.grid_thumbnail_loader.cancel_pending()
+        self.asset_list_view.viewport().update()
+
+    def get_current_asset_code(self):
+        return self.asset_list_view.currentIndex().data(AssetListModel.CODE_ROLE) or ""
+
+    def set_current_position(self, position):
+        index = self.asset_list_model.index(position)
+        if index.isValid():
+            self.asset_list_view.setCurrentIndex(index)
+            self.asset_list_view.scrollTo(index)
 
     def load_image_preview(self, file_name):
-        """ loads PixMap of file_name to QLabel """
-        img_url = "{}/{}".format(self.ASSET_DIR_PATH, file_name)
-        file_info = QtCore.QFileInfo(img_url)
-        if file_info:
-            image = QtGui.QImage(img_url)
-            image.scaled(self.image_preview_lbl.width(), self.image_preview_lbl.height(), QtCore.Qt.KeepAspectRatio,
-                         QtCore.Qt.SmoothTransformation)
-
-            pixmap = QtGui.QPixmap(image)
-        else:
-            pixmap = QtGui.QPixmap(self.preview_image_label.size())
+        """ Shows cached preview of file_name in QLabel, otherwise it is loaded in background """
+        self.current_image_path = self.get_image_url(file_name)
+
+        pixmap = self.thumbnail_loader.get(self.current_image_path)
+        if pixmap is None:
+            pixmap = QtGui.QPixmap(self.image_preview_lbl.size()) # empty until thumbnail_loaded
             pixmap.fill(QtCore.Qt.transparent)
+            self.thumbnail_loader.request(self.current_image_path, priority=1)
 
         self.image_preview_lbl.setPixmap(pixmap)
 
-    def save_assets_to_json(self):
+    def prefetch_image_previews(self):
+        """ Loads previews of neighbouring assets, so switching to them is instant """
+        current_position = self.asset_list_view.currentIndex().row()
+        image_paths = [self.current_image_path]
+        for offset in range(1, self.PREFETCH_COUNT + 1):
+            for position in (current_position + offset, current_position - offset):
+                if 0 <= position < self.asset_list_model.rowCount():
+                    image_paths.append(self.asset_list_model.get_image_path(position))
+
+        self.thumbnail_loader.cancel_pending(image_paths) # user already moved away from older neighbours
+        for image_path in image_paths[1:]:
+            self.thumbnail_loader.request(image_path)
+
+    def on_thumbnail_loaded(self, image_path):
+        if image_path == self.current_image_path:
+            self.image_preview_lbl.setPixmap(self.thumbnail_loader.get(image_path))
+
+    def on_images_changed(self, added, changed, removed):
+        """
+        Updates only assets affected by changed image files
+        New images get catalog entry, thumbnails of changed and removed images are loaded again
+        Catalog entries of removed images are kept, metadata is not lost when image is replaced
+        """
+        new_file_names = []
+        for file_name in added:
+            image_path = self.get_image_url(file_name)
+            if image_path not in self.asset_list_model.rows_by_image_path:
+                new_file_names.append(file_name)
+            elif self.is_image_missing(image_path): # image of existing asset appeared again
+                self.refresh_image(image_path)
+
+        for file_name in changed + removed:
+            self.refresh_image(self.get_image_url(file_name))
+
+        if new_file_names:
+            self.add_assets_for_images(new_file_names)
+
+    def add_assets_for_images(self, file_names):
+        """ Creates catalog entries for new images in one catalog write """
+        new_assets = []
+        new_codes = set()
+        for file_name in sorted(file_names):
+            base_name = os.path.splitext(file_name)[0]
+            code = base_name
+            suffix = 1
+            while code in new_codes or code in self.asset_list_model.rows_by_code:
+                code = "{}_{}".format(base_name, suffix)
+                suffix += 1
+            new_codes.add(code)
+
+            try:
+                file_time = datetime.fromtimestamp(os.path.getmtime(self.get_image_url(file_name)))
+            except OSError: # removed meanwhile, next scan reports it
+                file_time = datetime.now()
+
+            new_assets.append((code, {
+                "name": base_name,
+                "description": "",
+                "creator": "",
+                "created": file_time.strftime("%Y/%m/%d"),
+                "modified": file_time.strftime("%Y/%m/%d, %H:%M:%S"),
+                "image_path": file_name,
+            }))
+
+        self.catalog.save_many(new_assets)
+
+        for code, asset_details in new_assets:
+            row = self.asset_list_model.add_asset(code, self.get_image_url(asset_details["image_path"]))
+            self.search_index.add(row, self.get_search_texts(code, asset_details))
+
+        if self.asset_list_model.is_filtered: # new assets are shown if they match search
+            self.search_assets()
+        elif not self.asset_list_view.currentIndex().isValid():
+            self.set_current_position(0)
+
+    def is_image_missing(self, image_path):
+        """ True if image could not be read last time it was loaded """
+        for loader in (self.thumbnail_loader, self.grid_thumbnail_loader):
+            pixmap = loader.get(image_path)
+            if pixmap is not None and pixmap.isNull():
+                return True
+        return False
+
+    def refresh_image(self, image_path):
+        """ Drops cached thumbnails of image, visible cells and preview request them again """
+        self.thumbnail_loader.invalidate(image_path)
+        self.grid_thumbnail_loader.invalidate(image_path)
+        self.asset_list_model.on_thumbnail_loaded(image_path)
+
+        if image_path == self.current_image_path:
+            self.load_image_preview(os.path.basename(image_path))
+
+    def get_image_url(self, file_name):
+        return "{}/{}".format(self.ASSET_DIR_PATH, file_name)
+
+    def save_asset(self):
         """
-            Stores updated value from form to json file
+            Stores updated value from form to catalog, only current asset is written
             Called via "Save" button
         """
-        asset_code = self.asset_list_cmb.currentText()
-        self.content[asset_code]["name"] = self.name_le.text()
-        self.content[asset_code]["description"] = self.description_ple.toPlainText()
-        self.content[asset_code]["creator"] = self.creator_le.text()
-        self.content[asset_code]["created"] = self.created_le.text()
-        self.content[asset_code]["modified"] = datetime.now().strftime("%Y/%m/%d, %H:%M:%S")
-
-        url = "{}/{}".format(self.ASSET_DIR_PATH, self.JSON_FILE_NAME)
-        shutil.copyfile(url, url+'.tmp')
-        try:
-            with open(url, 'w') as asset_file:
-                json.dump(self.content, asset_file)
-        except:
-            shutil.copyfile(url + '.tmp', url)
-        finally:
-            os.remove(url + '.tmp')
+        asset_code = self.get_current_asset_code()
+        asset_details = self.catalog.get(asset_code)
+        if asset_details is None:
+            return
+
+        row = self.asset_list_model.rows_by_code[asset_code]
+        self.search_index.remove(row, self.get_search_texts(asset_code, asset_details))
+
+        asset_details["name"] = self.name_le.text()
+        asset_details["description"] = self.description_ple.toPlainText()
+        asset_details["creator"] = self.creator_le.text()
+        asset_details["created"] = self.created_le.text()
+        asset_details["modified"] = datetime.now().strftime("%Y/%m/%d, %H:%M:%S")
+
+        self.catalog.save(asset_code, asset_details)
+        self.search_index.add(row, self.get_search_texts(asset_code, asset_details))
+        self.modified_le.setText(asset_details["modified"])
+
+    def showEvent(self, event):
+        super(AssetViewer, self).showEvent(event)
+        self.directory_watcher.start() # images without catalog entry are added once scan finishes
+
+    def closeEvent(self, event):
+        self.directory_watcher.stop()
+        self.thumbnail_loader.stop() # no decoding continues after window is closed
+        self.grid_thumbnail_loader.stop()
+        self.catalog.close() # catalog reopens itself when window is shown and used again
+        super(AssetViewer, self).closeEvent(event)
 
 if __name__ == "__main__":
     app = QtWidgets.QApplication()
@@ -1,5 +1,9 @@
 from PySide2 import QtWidgets, QtGui, QtCore
+from collections import OrderedDict
+import numpy as np
 import maya.cmds as cmds
+import maya.OpenMaya as om
+import maya.OpenMayaAnim as oma
 import pymel.core as pm
 
 ''' App that allows select object(s) in the Maya stage, store their start and end values 
@@ -7,29 +11,123 @@ import pymel.core as pm
     Allows driving change of state from start to end via slider.
 '''
 
-NODE = 'node'
 START = 'start'
 END = 'end'
-CACHE = 'cache'
 
 SLIDER_MIN = 0
 SLIDER_MAX = 50
 
 AXIS = ['x', 'y', 'z']
 
+TRANSFORM_ATTRIBUTES = [attribute + axis.upper() for attribute in ['translate', 'rotate', 'scale'] for axis in AXIS]
+
+LINEAR = 'linear'
+SMOOTHSTEP = 'smoothstep'
+BEZIER = 'bezier'
+EASINGS = [LINEAR, SMOOTHSTEP, BEZIER]
+
+BEZIER_CONTROL_POINTS = (0.42, 0.0, 0.58, 1.0) # x1, y1, x2, y2 of ease-in-out timing curve
+
+def cubic_bezier(x, x1, y1, x2, y2, iterations=8):
+    '''
+    Evaluates timing curve going through (0, 0), (x1, y1), (x2, y2), (1, 1) for every x at once
+    Curve parameter for x is found by Newton iterations over the whole array
+    '''
+    def curve(t, p1, p2):
+        return 3.0 * (1.0 - t) ** 2 * t * p1 + 3.0 * (1.0 - t) * t ** 2 * p2 + t ** 3
+
+    def slope(t, p1, p2):
+        return 3.0 * (1.0 - t) ** 2 * p1 + 6.0 * (1.0 - t) * t * (p2 - p1) + 3.0 * t ** 2 * (1.0 - p2)
+
+    t = np.array(x, dtype=np.float64)
+    for _ in range(iterations):
+        derivative = slope(t, x1, x2)
+        step = np.divide(curve(t, x1, x2) - x, derivative, out=np.zeros_like(t), where=np.abs(derivative) > 1e-9)
+        t = np.clip(t - step, 0.0, 1.0)
+    return curve(t, y1, y2)
+
+def ease(weights, easing):
+    ''' Maps linear weights in 0..1 range to eased weights '''
+    weights = np.clip(np.asarray(weights, dtype=np.float64), 0.0, 1.0)
+    if easing == SMOOTHSTEP:
+        return weights * weights * (3.0 - 2.0 * weights)
+    if easing == BEZIER:
+        return cubic_bezier(weights, *BEZIER_CONTROL_POINTS)
+    return weights
+
+def to_double_array(values):
+    ''' Copies numpy values into MDoubleArray in one call instead of appending one by one '''
+    values = np.ascontiguousarray(values, dtype=np.float64).tolist()
+    util = om.MScriptUtil()
+    util.createFromList(values, len(values))
+    return om.MDoubleArray(util.asDoublePtr(), len(values))
+
+def get_anim_curve(plug, modifier):
+    '''
+    Anim curve driving plug, new curve is created and connected when plug is not animated yet
+    Creation is recorded in modifier, caller calls its doIt
+    '''
+    sources = om.MPlugArray()
+    plug.connectedTo(sources, True, False)
+    if sources.length():
+        source = sources[0].node()
+        if not source.hasFn(om.MFn.kAnimCurve):
+            return None # driven by constraint, expression...
+        return oma.MFnAnimCurve(source)
+
+    curve = oma.MFnAnimCurve()
+    curve.create(plug, modifier)
+    return curve
+
+def remove_keys(curve, start_time, end_time, change):
+    ''' Removes keys between start_time and end_time (inclusive), keys outside of range are kept '''
+    for index in reversed(range(curve.numKeys())): # from the last one, indexes of remaining keys do not shift
+        time = curve.time(index)
+        if start_time <= time <= end_time:
+            curve.remove(index, change)
+
+def to_ui_value(plug, value):
+    ''' Converts internal value of plug to UI units which cmds.setAttr expects, eg. radians to degrees '''
+    attribute = plug.attribute()
+    if attribute.hasFn(om.MFn.kUnitAttribute):
+        unit_type = om.MFnUnitAttribute(attribute).unitType()
+        if unit_type == om.MFnUnitAttribute.kDistance:
+            return om.MDistance.internalToUI(value)
+        if unit_type == om.MFnUnitAttribute.kAngle:
+            return om.MAngle.internalToUI(value)
+    return value
+
+def is_interpolable(plug):
+    ''' Only continuous numeric attributes are blended, booleans and enums would be rounded anyway '''
+    attribute = plug.attribute()
+    if attribute.hasFn(om.MFn.kUnitAttribute):
+        return True
+    if not attribute.hasFn(om.MFn.kNumericAttribute):
+        return False
+    return om.MFnNumericAttribute(attribute).unitType() not in (om.MFnNumericData.kBoolean, om.MFnNumericData.kInvalid)
+
 class Interpolator(QtWidgets.QDialog):
 
     def __init__(self):
         super(Interpolator, self).__init__()
-        print("init")
         self.setWindowTitle("Interpolator tool")
         self.setWindowFlags(QtCore.Qt.WindowStaysOnTopHint)
         self.create_ui()
         self.set_connections()
 
-        self.items = {}
+        self.items = OrderedDict() # node name -> PyNode
+        self.last_bake = None # (MDGModifier, MAnimCurveChange) of last bake, reverted by Undo Bake
+        self.clear_values()
         self.enable_buttons(False)
 
+        # slider changes are coalesced, only latest value is written once per event loop tick
+        self.pending_slider_value = None
+        self.drag_start_values = None # values of all channels before slider drag, restored before undoable write
+        self.slider_timer = QtCore.QTimer(self)
+        self.slider_timer.setSingleShot(True)
+        self.slider_timer.setInterval(0)
+        self.slider_timer.timeout.connect(self.apply_slider_value)
+
 
     def create_ui(self):
         layout = QtWidgets.QVBoxLayout()
@@ -81,6 +179,29 @@ class Interpolator(QtWidgets.QDialog):
         layout_transform.addWidget(self.chk_attributes)
         layout_transform.addWidget(lbl_attributes)
 
+        layout_easing = QtWidgets.QHBoxLayout()
+        lbl_easing = QtWidgets.QLabel("Easing")
+        self.cmb_easing = QtWidgets.QComboBox()
+        self.cmb_easing.addItems(EASINGS)
+        layout_easing.addWidget(lbl_easing)
+        layout_easing.addWidget(self.cmb_easing)
+
+        layout_bake = QtWidgets.QHBoxLayout()
+        self.spn_start_frame = QtWidgets.QSpinBox()
+        self.spn_end_frame = QtWidgets.QSpinBox()
+        for spin_box in (self.spn_start_frame, self.spn_end_frame):
+            spin_box.setRange(-100000, 100000)
+        self.spn_start_frame.setValue(int(cmds.playbackOptions(query=True, minTime=True)))
+        self.spn_end_frame.setValue(int(cmds.playbackOptions(query=True, maxTime=True)))
+        self.btn_bake = QtWidgets.QPushButton("Bake")
+        self.btn_undo_bake = QtWidgets.QPushButton("Undo Bake")
+        self.btn_undo_bake.setEnabled(False)
+        layout_bake.addWidget(QtWidgets.QLabel("Frames"))
+        layout_bake.addWidget(self.spn_start_frame)
+        layout_bake.addWidget(self.spn_end_frame)
+        layout_bake.addWidget(self.btn_bake)
+        layout_bake.addWidget(self.btn_undo_bake)
+
         # stylesheet = "color: lightgray; "
         # self.btn_store_items.setStyleSheet(stylesheet)
         # self.btn_clear_items.setStyleSheet(stylesheet)
@@ -92,6 +213,8 @@ class Interpolator(QtWidgets.QDialog):
         layout.addLayout(layout_start_end)
         layout.addLayout(layout_slider)
         layout.addLayout(layout_transform)
+        layout.addLayout(layout_easing)
+        layout.addLayout(layout_bake)
 
         self.setLayout(layout)
 
@@ -101,7 +224,12 @@ class Interpolator(QtWidgets.QDialog):
         self.btn_store_start.clicked.connect(self.store_start)
         self.btn_store_end.clicked.connect(self.store_end)
         self.btn_reset.clicked.connect(self.reset)
+        self.btn_bake.clicked.connect(self.bake)
+        self.btn_undo_bake.clicked.connect(self.undo_bake)
         self.slider.valueChanged.connect(self.slider_changed)
+        self.slider.sliderPressed.connect(self.slider_pressed)
+        self.slider.sliderReleased.connect(self.slider_released)
+        self.cmb_easing.currentIndexChanged.connect(self.easing_changed)
 
 
     def store_items(self):
@@ -110,23 +238,32 @@ class Interpolator(QtWidgets.QDialog):
 
         if not selection: return
 
-        self.items = {}
-        for item in selection:
-            self.items[item.name()] = {NODE : item, START:{}, END:{}, CACHE:{}}
+        self.items = OrderedDict((item.name(), item) for item in selection)
+        self.clear_values()
 
         self.enable_buttons(True)
 
     def clear_items(self):
         ''' Clear saved items and their states '''
-        self.items = {}
+        self.items = OrderedDict()
+        self.clear_values()
         self.enable_buttons(False)
 
     def reset(self):
         ''' Reset saved objects to empty state'''
-        for item in self.items():
-            self.items[item] = {NODE : item, START:{}, END:{}, CACHE:{}}
+        self.clear_values()
 
-        print(self.items)
+    def clear_values(self):
+        ''' Forget stored start and end values, values are kept per channel (node, attribute) in numpy arrays '''
+        self.channels = OrderedDict() # (node name, attribute) -> position in value arrays
+        self.type_attributes = {} # node type -> keyable attributes every node of that type has
+        self.plugs = [] # MPlug per channel, values are written without attribute lookup
+        self.values = {START: np.zeros(0), END: np.zeros(0)} # NaN for channel not stored in that state
+        self.clear_frame_cache()
+
+    def clear_frame_cache(self):
+        self.cache_positions = np.zeros(0, dtype=np.int64) # channels stored in both states
+        self.frame_cache = None # interpolated values, one row per slider step
 
     def enable_buttons(self, value):
         ''' Enable/disable buttons based on stored items'''
@@ -134,49 +271,229 @@ class Interpolator(QtWidgets.QDialog):
         self.btn_reset.setEnabled(value)
         self.btn_store_start.setEnabled(value)
         self.btn_store_end.setEnabled(value)
+        self.btn_bake.setEnabled(value)
 
     def store_start(self):
-        print('store_start')
         self._store(START)
         self.slider.setValue(SLIDER_MIN)
 
     def store_end(self):
-        print('store_end')
         self._store(END)
         self.slider.setValue(SLIDER_MAX)
 
+    def get_type_attributes(self, node_type, name):
+        '''
+        Keyable numeric attributes of node type, queried once per type on its first node
+        User defined attributes are left out as they differ per node
+        '''
+        if node_type not in self.type_attributes:
+            keyable = cmds.listAttr(name, keyable=True, scalar=True) or []
+            user_defined = set(cmds.listAttr(name, userDefined=True) or [])
+            self.type_attributes[node_type] = [attribute for attribute in keyable
+                                               if attribute not in user_defined and attribute not in TRANSFORM_ATTRIBUTES]
+        return self.type_attributes[node_type]
+
+    def get_channel_keys(self):
+        ''' (node name, attribute) of every channel which is interpolated for stored items '''
+        names = list(self.items.keys())
+        transform = self.chk_transform.isChecked()
+        attributes = self.chk_attributes.isChecked()
+
+        node_types = {}
+        if attributes:
+            listed = cmds.ls(names, showType=True) or [] # one query, pairs of name and type
+            node_types = dict(zip(listed[::2], listed[1::2]))
+
+        keys = []
+        for name in names:
+            if transform:
+                keys.extend((name, attribute) for attribute in TRANSFORM_ATTRIBUTES)
+            if attributes and name in node_types:
+                keys.extend((name, attribute) for attribute in self.get_type_attributes(node_types[name], name))
+                keys.extend((name, attribute) for attribute in cmds.listAttr(name, userDefined=True, scalar=True) or []
+                            if attribute not in TRANSFORM_ATTRIBUTES)
+        return keys
+
     def _store(self, step):
         if not self.items: return
 
-        for item in self.items.values():
-            if self.chk_transform.isChecked():
-                translateX, translateY, translateZ = item[NODE].translate.get()
-                item[step] = { 'translateX' : translateX, 'translateY' : translateY, 'translateZ' : translateZ}
+        positions = self._add_channels(self.get_channel_keys())
+
+        # values are read and written in internal units, so no conversion is needed
+        self.values[step][positions] = np.fromiter((self.plugs[position].asDouble() for position in positions),
+                                                   dtype=np.float64, count=len(positions))
+
+        self._build_frame_cache()
+
+    def _add_channels(self, keys):
+        ''' Returns positions of channels in value arrays, new channels are appended '''
+        positions = []
+        functions = {}
+        for key in keys:
+            if key not in self.channels:
+                name, attribute = key
+                if name not in functions:
+                    functions[name] = om.MFnDependencyNode(self.items[name].__apimobject__())
+                function = functions[name]
+                if not function.hasAttribute(attribute): # transform attributes of non transform nodes
+                    continue
+                plug = function.findPlug(attribute, False)
+                if plug.isLocked() or not is_interpolable(plug):
+                    continue
+                self.channels[key] = len(self.plugs)
+                self.plugs.append(plug)
+            positions.append(self.channels[key])
+
+        for step in (START, END):
+            missing = len(self.plugs) - len(self.values[step])
+            if missing:
+                self.values[step] = np.concatenate([self.values[step], np.full(missing, np.nan)])
+
+        return np.array(positions, dtype=np.int64)
 
     def slider_changed(self, value):
+        self.pending_slider_value = value
+        if not self.slider_timer.isActive():
+            self.slider_timer.start()
+
+    def slider_pressed(self):
+        self.drag_start_values = np.fromiter((plug.asDouble() for plug in self.plugs), dtype=np.float64, count=len(self.plugs))
+
+    def slider_released(self):
+        '''
+        Drag writes outside of undo queue, so it is not flooded by every step
+        Values before drag are put back and final value is written once as single undoable change
+        '''
+        self.slider_timer.stop()
+        if self.drag_start_values is not None:
+            self._write(np.arange(len(self.drag_start_values)), self.drag_start_values)
+            self.drag_start_values = None
+        self.pending_slider_value = self.slider.value()
+        self.apply_slider_value()
+
+    def easing_changed(self, index):
+        ''' Easing reshapes every slider step, so cached frames are rebuilt and current step is reapplied '''
+        self._build_frame_cache()
+        self.slider_changed(self.slider.value())
+
+    def apply_slider_value(self):
+        ''' Only changes made while slider is dragged are left out of undo queue '''
+        value = self.pending_slider_value
+        undoable = not self.slider.isSliderDown()
         if value == SLIDER_MIN: # start
-            self._change_state(START)
+            self._change_state(START, undoable)
         elif value == SLIDER_MAX:
-            self._change_state(END)
+            self._change_state(END, undoable)
         else:
-            self._change_state_step(value)
-
-    def _change_state_step(self, step):
-        print("_change_state_step {}".format(step))
-        for item in self.items.values():
-            node = item[NODE]
-            zipped = zip(item[START].items(), item[END].items())
-            for zz in zipped:
-                start = zz[0]
-                diff = zz[1][1] - zz[0][1] # change of value end - start
-                diff = diff / (SLIDER_MAX - SLIDER_MIN) * step
-                node.attr(zz[0][0]).set(zz[0][1] + diff)
-
-    def _change_state(self, step):
-        for item in self.items.values():
-            node = item[NODE]
-            for key, value in item[step].items(): # return tuples for 'start', 'end'
-                node.attr(key).set(value)
+            self._change_state_step(value, undoable)
+
+    def _interpolate(self, weights):
+        '''
+        Blends all channels stored in both states with one vectorized lerp, weights are eased first
+        Returns positions of channels and matrix of values, one row per weight
+        '''
+        weights = ease(weights, self.cmb_easing.currentText())
+        positions = np.flatnonzero(~np.isnan(self.values[START]) & ~np.isnan(self.values[END]))
+        start = self.values[START][positions]
+        end = self.values[END][positions]
+
+        weights = np.asarray(weights, dtype=np.float64)[:, np.newaxis]
+        return positions, np.ascontiguousarray(start + (end - start) * weights)
+
+    def _build_frame_cache(self):
+        ''' Precomputes values for every slider step, scrubbing is then only lookup and write '''
+        self.clear_frame_cache()
+
+        weights = np.linspace(0.0, 1.0, SLIDER_MAX - SLIDER_MIN + 1)
+        positions, frames = self._interpolate(weights)
+        if len(positions):
+            self.cache_positions = positions
+            self.frame_cache = frames
+
+    def bake(self):
+        '''
+        Keys interpolation from start to end over frame range
+        All frames are evaluated in one pass, keys are then added in bulk per anim curve
+        Only keys inside frame range are replaced, keys outside of it are kept
+        API edits are not in Maya undo queue, they are recorded so Undo Bake could revert them
+        '''
+        start_frame = self.spn_start_frame.value()
+        end_frame = self.spn_end_frame.value()
+        if end_frame <= start_frame: return
+
+        frame_count = end_frame - start_frame + 1
+        positions, frames = self._interpolate(np.linspace(0.0, 1.0, frame_count))
+        if not len(positions): return # start or end not stored yet
+
+        times = om.MTimeArray()
+        unit = om.MTime.uiUnit()
+        for frame in range(start_frame, end_frame + 1):
+            times.append(om.MTime(frame, unit))
+
+        frames = np.asfortranarray(frames) # columns are read per curve
+        modifier = om.MDGModifier() # creation and connection of new curves
+        change = oma.MAnimCurveChange() # removed and added keys
+        skipped = []
+        for column, position in enumerate(positions.tolist()):
+            plug = self.plugs[position]
+            curve = get_anim_curve(plug, modifier)
+            if curve is None:
+                skipped.append(plug.name())
+                continue
+            remove_keys(curve, times[0], times[times.length() - 1], change)
+            # values are in internal units which is what API expects for angular curves as well
+            curve.addKeys(times, to_double_array(frames[:, column]), oma.MFnAnimCurve.kTangentGlobal,
+                          oma.MFnAnimCurve.kTangentGlobal, True, change)
+        modifier.doIt()
+
+        self.last_bake = (modifier, change)
+        self.btn_undo_bake.setEnabled(True)
+
+        om.MGlobal.displayInfo('Interpolator: baked {} channels over {} frames'.format(len(positions) - len(skipped), frame_count))
+        if skipped:
+            om.MGlobal.displayWarning('Interpolator: skipped channels driven by other nodes: {}'.format(', '.join(skipped)))
+
+    def undo_bake(self):
+        ''' Reverts keys of last bake, then removes anim curves it created '''
+        if self.last_bake is None: return
+
+        modifier, change = self.last_bake
+        change.undoIt()
+        modifier.undoIt()
+        self.last_bake = None
+        self.btn_undo_bake.setEnabled(False)
+        om.MGlobal.displayInfo('Interpolator: last bake was reverted')
+
+    def _change_state_step(self, step, undoable=False):
+        if self.frame_cache is None: return # start or end not stored yet
+
+        self._write(self.cache_positions, self.frame_cache[step - SLIDER_MIN], undoable)
+
+    def _change_state(self, step, undoable=False):
+        positions = np.flatnonzero(~np.isnan(self.values[step]))
+        self._write(positions, self.values[step][positions], undoable)
+
+    def _write(self, positions, values, undoable=False):
+        '''
+        Pushes values to the scene in one batch, not recorded in undo queue
+        Undoable write goes through cmds.setAttr in one undo chunk, so Ctrl+Z reverts all channels at once
+        '''
+        if not len(positions): return
+
+        if undoable:
+            cmds.undoInfo(openChunk=True, chunkName='interpolatorSetValues')
+            try:
+                for position, value in zip(positions.tolist(), values.tolist()):
+                    plug = self.plugs[position]
+                    cmds.setAttr(plug.name(), to_ui_value(plug, value))
+            finally:
+                cmds.undoInfo(closeChunk=True)
+            return
+
+        modifier = om.MDGModifier()
+        for position, value in zip(positions.tolist(), values.tolist()):
+            modifier.newPlugValueDouble(self.plugs[position], value)
+        modifier.doIt()
 
 if __name__ == '__main__':
     ui = Interpolator()
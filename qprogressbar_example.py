@@ -1,10 +1,13 @@
+import threading
 import time
+import traceback
 
 from PySide2 import QtCore
 from PySide2 import QtWidgets
 from shiboken2 import wrapInstance
 
 import maya.cmds as cmds
+import maya.OpenMaya as om
 import maya.OpenMayaUI as omui
 
 
@@ -16,6 +19,127 @@ def maya_main_window():
     return wrapInstance(long(main_window_ptr), QtWidgets.QWidget)
 
 
+class CancellationToken(object):
+    """
+    Shared by GUI and worker thread, work checks it between (and inside) chunks and stops when it is set
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def is_cancelled(self):
+        return self._event.is_set()
+
+
+class TaskSignals(QtCore.QObject):
+    """
+    QRunnable is not QObject, so its signals live here
+    Signals are emitted from worker thread and delivered to GUI thread through queued connections
+    """
+    progress = QtCore.Signal(int, int) # done, total
+    result = QtCore.Signal(object) # list of results of all chunks
+    error = QtCore.Signal(str) # formatted traceback
+    cancelled = QtCore.Signal()
+    finished = QtCore.Signal() # always last, after result, error or cancelled
+
+
+class Task(QtCore.QRunnable):
+    """
+    Runs function(chunk, token) over items chunk by chunk on worker thread, results of chunks are concatenated
+    Token is checked before every chunk, long chunks could check it as well
+    Progress is emitted at most once per progress_interval seconds, however short the chunks are
+
+    Function must not touch Qt widgets and should not call maya.cmds, use maya.utils.executeInMainThreadWithResult
+    for the parts which have to run in main thread
+    """
+    def __init__(self, function, items, chunk_size=1, progress_interval=0.1):
+        super(Task, self).__init__()
+
+        self.function = function
+        self.items = list(items)
+        self.chunk_size = max(1, chunk_size)
+        self.progress_interval = progress_interval
+
+        self.token = CancellationToken()
+        self.signals = TaskSignals()
+
+    def run(self):
+        total = len(self.items)
+        results = []
+        last_progress = 0.0
+        try:
+            for start in range(0, total, self.chunk_size):
+                if self.token.is_cancelled():
+                    self.signals.cancelled.emit()
+                    return
+
+                results.extend(self.function(self.items[start:start + self.chunk_size], self.token) or [])
+
+                done = min(start + self.chunk_size, total)
+                now = time.time()
+                if now - last_progress >= self.progress_interval or done == total:
+                    last_progress = now
+                    self.signals.progress.emit(done, total)
+
+            if self.token.is_cancelled(): # last chunk stopped early
+                self.signals.cancelled.emit()
+            else:
+                self.signals.result.emit(results)
+        except Exception:
+            self.signals.error.emit(traceback.format_exc())
+        finally:
+            self.signals.finished.emit()
+
+
+class TaskRunner(QtCore.QObject):
+    """
+    Starts tasks in its own thread pool, pool deletes every task once it has run
+    Only cancellation tokens of running tasks are kept, so all of them could be cancelled
+    """
+    def __init__(self, max_thread_count=1, parent=None):
+        super(TaskRunner, self).__init__(parent)
+
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(max_thread_count)
+        self.tokens = []
+
+    def start(self, task):
+        """
+        Queues task, its signals should be connected before
+        Returns: CancellationToken of task
+
+        """
+        token = task.token
+        self.tokens.append(token)
+        task.signals.finished.connect(lambda: self.tokens.remove(token))
+        self.pool.start(task)
+        return token
+
+    def cancel_all(self):
+        for token in self.tokens:
+            token.cancel()
+
+    def wait_for_done(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+
+def simulate_work(chunk, token):
+    """
+    Example of chunk function, every step sleeps a while and is cancellable
+    Returns: list of processed steps
+
+    """
+    processed = []
+    for step in chunk:
+        if token.is_cancelled():
+            break
+        time.sleep(0.05)
+        processed.append(step)
+    return processed
+
+
 class ProgressTestDialog(QtWidgets.QDialog):
 
     WINDOW_TITLE = "Progress Test"
@@ -32,6 +156,8 @@ class ProgressTestDialog(QtWidgets.QDialog):
         self.setMinimumSize(300, 100)
         
         self.test_is_running = False
+        self.token = None # of running task
+        self.runner = TaskRunner(parent=self)
 
         self.create_widgets()
         self.create_layout()
@@ -74,42 +200,68 @@ class ProgressTestDialog(QtWidgets.QDialog):
         self.cancel_button.setVisible(self.test_is_running)
 
     def run_progress_test(self):
-
+        """
+        Starts work on worker thread and returns immediately, GUI stays responsive
+        """
         if self.test_is_running:
             return
- 
-        QtCore.QCoreApplication.processEvents()
-        
-        number_of_operations = 10
-        
+
+        number_of_operations = 100
+
         self.progress_bar.setRange(0, number_of_operations)
         self.progress_bar.setValue(0)
-        
+        self.progress_bar_label.setText("Operation Progress")
+
         self.test_is_running = True
         self.update_visibility()
-        
-        for i in range(1, number_of_operations + 1):
-            if not self.test_is_running:
-                break
-            
-            self.progress_bar_label.setText('Processing step {} of {}'.format(i, number_of_operations))
-            self.progress_bar.setValue(i)
-            time.sleep(0.5)
-            
-            QtCore.QCoreApplication.processEvents()
-        
-        self.test_is_running = False
-        self.update_visibility()
-        
-        
+
+        task = Task(simulate_work, range(1, number_of_operations + 1), chunk_size=5)
+        task.signals.progress.connect(self.on_progress)
+        task.signals.result.connect(self.on_result)
+        task.signals.error.connect(self.on_error)
+        task.signals.finished.connect(self.on_finished)
+        self.token = self.runner.start(task)
 
     def cancel_progress_test(self):
-        if not self.test_is_running:
+        """
+        Asks running work to stop, dialog is reset once worker confirms it by finished signal
+        """
+        if not self.test_is_running or not self.token:
             return
-        
+
+        self.token.cancel()
+        self.cancel_button.setEnabled(False)
+        self.progress_bar_label.setText("Cancelling...")
+
+    def on_progress(self, done, total):
+        if self.token and self.token.is_cancelled():
+            return
+        self.progress_bar_label.setText('Processing step {} of {}'.format(done, total))
+        self.progress_bar.setValue(done)
+
+    def on_result(self, results):
+        om.MGlobal.displayInfo("Progress test: processed {} steps".format(len(results)))
+
+    def on_error(self, message):
+        """
+        message is traceback of exception raised in worker thread
+        """
+        om.MGlobal.displayError("Progress test failed:\n{}".format(message))
+
+    def on_finished(self):
+        self.token = None
         self.test_is_running = False
+        self.cancel_button.setEnabled(True)
         self.update_visibility()
 
+    def closeEvent(self, event):
+        """
+        Running work is cancelled and waited for, it stops within one step
+        """
+        self.runner.cancel_all()
+        self.runner.wait_for_done()
+        super(ProgressTestDialog, self).closeEvent(event)
+
 
 if __name__ == "__main__":
 
@@ -1,24 +1,287 @@
 from PySide2 import QtCore, QtWidgets, QtGui
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+import heapq
 
 '''
     Lists various lights/switches in the building and their state (On/Off).
-    Allows searching by name of item and search auto finishing.
+    Allows searching by name of item and search auto finishing, completions are fuzzy and ranked.
+    Switches many items at once and stores states of all items as named scenes.
     Exercise for PySide2
 '''
 
+def subtract_range(first, last, other_first, other_last):
+    ''' Parts of range first..last (exclusive) which are outside of other range, at most two ranges '''
+    ranges = [(first, min(last, other_first)), (max(first, other_last), last)]
+    return [(start, end) for start, end in ranges if start < end]
+
+STATES_TO_BITS = bytes.maketrans(b'\x00\x01', b'01')
+BITS_TO_STATES = bytes.maketrans(b'01', b'\x00\x01')
+
+def pack_states(states):
+    ''' Packs one byte per switch into bitmap, one bit per switch, without loop in Python '''
+    if not states:
+        return b''
+    bits = bytes(states).translate(STATES_TO_BITS)[::-1] # first switch is lowest bit
+    return int(bits, 2).to_bytes((len(states) + 7) // 8, 'little')
+
+def unpack_states(bitmap, count):
+    ''' Inverse of pack_states, returns bytearray with one byte per switch '''
+    if not count:
+        return bytearray()
+    bits = format(int.from_bytes(bitmap, 'little'), '0{}b'.format(count))[::-1]
+    return bytearray(bits.encode('ascii').translate(BITS_TO_STATES))
+
+def get_runs(rows):
+    ''' Groups sorted rows into (first, last) runs of consecutive rows '''
+    runs = []
+    for row in rows:
+        if runs and runs[-1][1] == row - 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return [(first, last) for first, last in runs]
+
+class PrefixIndex(object):
+    '''
+        Lowercase names in sorted order, names starting with prefix are one contiguous slice found by binary search
+    '''
+    def __init__(self, names):
+        pairs = sorted((name.lower(), position) for position, name in enumerate(names))
+        self.keys = [key for key, _ in pairs]
+        self.positions = [position for _, position in pairs] # sorted slot -> position of item
+
+    def get_range(self, prefix):
+        ''' Sorted slots first..last (exclusive) of names starting with prefix '''
+        if not prefix:
+            return 0, len(self.keys)
+        first = bisect_left(self.keys, prefix)
+        last = bisect_left(self.keys, prefix + u'\U0010ffff', first) # after every name with this prefix
+        return first, last
+
+    def add(self, name, position):
+        ''' Inserts name at its sorted slot and returns the slot '''
+        key = name.lower()
+        slot = bisect_right(self.keys, key)
+        self.keys.insert(slot, key)
+        self.positions.insert(slot, position)
+        return slot
+
+    def find(self, name):
+        ''' Position of item with exactly this name (case insensitive), None if there is none '''
+        key = name.lower()
+        slot = bisect_left(self.keys, key)
+        if slot < len(self.keys) and self.keys[slot] == key:
+            return self.positions[slot]
+        return None
+
+class NgramIndex(object):
+    '''
+        Completions are ranked - recently used names, names starting with query, names containing query
+        and at last names whose words are similar to words of query, which catches typos
+        Trigrams of whole names find substrings, padded bigrams of distinct words find similar words
+        Both are built once and extended as names are added
+    '''
+    N = 3
+    SIMILARITY = 0.4 # minimal Dice coefficient of word bigrams, 'lmap' is still similar to 'lamp'
+    RECENT_LIMIT = 100
+
+    def __init__(self, prefix_index):
+        self.prefix_index = prefix_index # sorted names, shared with filter
+
+        self.keys = [None] * len(prefix_index.keys) # position -> lowercase name
+        self.postings = {} # trigram -> set of positions
+        self.words = {} # word -> set of positions
+        self.sorted_words = [] # for words starting with unfinished last word of query
+        self.word_postings = {} # bigram -> set of words
+        self.recent = OrderedDict() # positions of used names, most recent last
+
+        for key, position in zip(prefix_index.keys, prefix_index.positions):
+            self.keys[position] = key
+            self.add_key(key, position)
+
+    def get_ngrams(self, key):
+        return set(key[start:start + self.N] for start in range(len(key) - self.N + 1))
+
+    def get_word_ngrams(self, word):
+        word = '^' + word + '$' # first and last letters count
+        return set(word[start:start + 2] for start in range(len(word) - 1))
+
+    def add_key(self, key, position):
+        for ngram in self.get_ngrams(key):
+            self.postings.setdefault(ngram, set()).add(position)
+
+        for word in key.split():
+            if word not in self.words:
+                self.words[word] = set()
+                self.sorted_words.insert(bisect_left(self.sorted_words, word), word)
+                for ngram in self.get_word_ngrams(word):
+                    self.word_postings.setdefault(ngram, set()).add(word)
+            self.words[word].add(position)
+
+    def add(self, name, position):
+        ''' Indexes new name, returns its slot in prefix index '''
+        slot = self.prefix_index.add(name, position)
+        key = self.prefix_index.keys[slot]
+        if position == len(self.keys):
+            self.keys.append(key)
+        else:
+            self.keys[position] = key
+        self.add_key(key, position)
+        return slot
+
+    def touch(self, position):
+        ''' Marks name as used, it is ranked higher in next searches '''
+        self.recent.pop(position, None)
+        self.recent[position] = None
+        if len(self.recent) > self.RECENT_LIMIT:
+            self.recent.popitem(last=False)
+
+    def get_similar_words(self, token, is_prefix):
+        '''
+            Words sharing enough bigrams with token, most similar first
+            Unfinished word (is_prefix) matches also words starting with it
+            Numbers are not similar to each other, they only match exactly or by prefix
+        '''
+        scored = {}
+        if not any(character.isdigit() for character in token):
+            ngrams = self.get_word_ngrams(token)
+            counts = Counter()
+            for ngram in ngrams:
+                counts.update(self.word_postings.get(ngram, ()))
+
+            for word, shared in counts.items():
+                score = 2.0 * shared / (len(ngrams) + len(word) + 1) # padded word has len + 1 bigrams at most
+                if score >= self.SIMILARITY:
+                    scored[word] = score
+        elif token in self.words:
+            scored[token] = 1.0
+
+        words = sorted(scored, key=lambda word: (-scored[word], word))
+        if is_prefix: # completions of unfinished word follow, already sorted
+            slot = bisect_left(self.sorted_words, token)
+            while slot < len(self.sorted_words) and self.sorted_words[slot].startswith(token):
+                if self.sorted_words[slot] not in scored:
+                    words.append(self.sorted_words[slot])
+                slot += 1
+        return words
+
+    def search(self, query, limit):
+        '''
+            Returns positions of at most 'limit' best matching names, best first
+            Recent and prefix stages stop as soon as limit is reached, substring matches are ranked by score
+        '''
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        results = []
+        seen = set()
+
+        def take(positions):
+            for position in positions:
+                if position not in seen:
+                    seen.add(position)
+                    results.append(position)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        keys = self.keys
+        recent = [position for position in reversed(self.recent) if query in keys[position]]
+        recent.sort(key=lambda position: not keys[position].startswith(query)) # stable, keeps recency
+        if take(recent):
+            return results
+
+        first, last = self.prefix_index.get_range(query)
+        positions = self.prefix_index.positions
+        if take(positions[slot] for slot in range(first, last)):
+            return results
+
+        ngrams = self.get_ngrams(query)
+        if ngrams:
+            postings = sorted((self.postings.get(ngram, set()) for ngram in ngrams), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else: # query shorter than trigram, names are scanned
+            candidates = range(len(keys))
+        # earlier match first, then shorter name, only best ones are kept instead of sorting all matches
+        matches = (position for position in candidates if position not in seen and query in keys[position])
+        if take(heapq.nsmallest(limit - len(results), matches,
+                                key=lambda position: (keys[position].find(query), len(keys[position]), keys[position]))):
+            return results
+
+        take(self.search_similar(query.split()))
+        return results
+
+    def search_similar(self, tokens):
+        '''
+            Yields positions of names having similar word for every token
+            Names are taken by words similar to longest token, most similar first
+        '''
+        similar = [self.get_similar_words(token, is_prefix=index == len(tokens) - 1) for index, token in enumerate(tokens)]
+        if not all(similar):
+            return
+
+        primary = max(range(len(tokens)), key=lambda index: len(tokens[index]))
+        # other tokens are checked on words of candidate name, positions of their words are never collected
+        others = [set(words) for index, words in enumerate(similar) if index != primary]
+        for word in similar[primary]:
+            for position in self.words[word]:
+                words = self.keys[position].split()
+                if all(any(word in other for word in words) for other in others):
+                    yield position
+
+class CompletionModel(QtCore.QAbstractListModel):
+    '''
+        Best ranked names for current query, QCompleter shows them as they are without filtering again
+    '''
+    LIMIT = 20
+
+    def __init__(self, search_index, switch_model, parent=None):
+        super(CompletionModel, self).__init__(parent)
+
+        self.search_index = search_index
+        self.switch_model = switch_model
+        self.positions = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.positions)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if index.isValid() and role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return self.switch_model.get_name(self.positions[index.row()])
+        return None
+
+    def set_query(self, text):
+        self.beginResetModel()
+        self.positions = self.search_index.search(text, self.LIMIT)
+        self.endResetModel()
+
 class MainWindow(QtWidgets.QMainWindow):
 
     def __init__(self):
         super(MainWindow, self).__init__()
 
-        self.items = []
-
         item_names = ["Kitchen Light", "Light", "Patio Light"] # for testing only
-        for name in item_names:
-            self.items.append(ItemWidget(name))
+        self.model = SwitchModel(item_names, self)
+
+        self.index = PrefixIndex(item_names)
+        self.filter_text = ''
+        self.visible_range = self.index.get_range(self.filter_text) # every item is shown at start
 
-        self.completer = QtWidgets.QCompleter(item_names)
-        self.completer.setCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self.search_index = NgramIndex(self.index)
+        self.completion_model = CompletionModel(self.search_index, self.model, self)
+        self.completer = QtWidgets.QCompleter(self.completion_model, self)
+        self.completer.setCompletionMode(QtWidgets.QCompleter.UnfilteredPopupCompletion) # model is ranked already
+
+        # filter is applied once typing pauses, not on every keystroke
+        self.filter_timer = QtCore.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+
+        self.scenes = OrderedDict() # scene name -> bitmap of states
 
         self.create_widgets()
         self.create_ui()
@@ -30,8 +293,35 @@ class MainWindow(QtWidgets.QMainWindow):
         self.search_input = QtWidgets.QLineEdit()
         self.search_input.setCompleter(self.completer)
 
+        self.list_view = QtWidgets.QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(SwitchDelegate(self.list_view))
+        self.list_view.setUniformItemSizes(True) # rows are not measured one by one
+        self.list_view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+
+        self.selected_on_btn = QtWidgets.QPushButton("Selected On")
+        self.selected_off_btn = QtWidgets.QPushButton("Selected Off")
+        self.filtered_on_btn = QtWidgets.QPushButton("Filtered On")
+        self.filtered_off_btn = QtWidgets.QPushButton("Filtered Off")
+
+        self.scene_combo = QtWidgets.QComboBox()
+        self.apply_scene_btn = QtWidgets.QPushButton("Apply Scene")
+        self.save_scene_btn = QtWidgets.QPushButton("Save Scene")
+        self.update_scene_buttons()
+
     def create_connections(self):
         self.search_input.textChanged.connect(self.text_changed)
+        self.search_input.textEdited.connect(self.update_completions)
+        self.completer.activated[str].connect(self.completion_activated)
+        self.filter_timer.timeout.connect(self.apply_filter)
+
+        self.selected_on_btn.clicked.connect(lambda: self.switch_selected(True))
+        self.selected_off_btn.clicked.connect(lambda: self.switch_selected(False))
+        self.filtered_on_btn.clicked.connect(lambda: self.switch_filtered(True))
+        self.filtered_off_btn.clicked.connect(lambda: self.switch_filtered(False))
+
+        self.apply_scene_btn.clicked.connect(self.apply_scene)
+        self.save_scene_btn.clicked.connect(self.save_scene)
 
     def create_ui(self):
         ''' Creates layout and adds widgets '''
@@ -41,98 +331,248 @@ class MainWindow(QtWidgets.QMainWindow):
         layout = QtWidgets.QVBoxLayout()
         layout.addWidget(self.search_input)
 
-        item_container = QtWidgets.QWidget()
-        item_container_layout = QtWidgets.QVBoxLayout()
-        for item in self.items:
-            item_container_layout.addWidget(item)
-        item_container.setLayout(item_container_layout)
+        layout.addWidget(self.list_view)
+
+        bulk_layout = QtWidgets.QHBoxLayout()
+        bulk_layout.addWidget(self.selected_on_btn)
+        bulk_layout.addWidget(self.selected_off_btn)
+        bulk_layout.addWidget(self.filtered_on_btn)
+        bulk_layout.addWidget(self.filtered_off_btn)
+        layout.addLayout(bulk_layout)
 
-        scroll_area = QtWidgets.QScrollArea()
-        scroll_area.setWidget(item_container)
-        scroll_area.setAlignment(QtCore.Qt.AlignTop)
-        layout.addWidget(scroll_area)
-        layout.addStretch()
+        scene_layout = QtWidgets.QHBoxLayout()
+        scene_layout.addWidget(self.scene_combo, 1)
+        scene_layout.addWidget(self.apply_scene_btn)
+        scene_layout.addWidget(self.save_scene_btn)
+        layout.addLayout(scene_layout)
 
         centralWidget.setLayout(layout)
 
         self.setCentralWidget(centralWidget)
 
     def text_changed(self):
-        ''' Refresh list of items '''
-        for item in self.items:
-            txt = self.search_input.text().lower()
-            if  txt == '' or item.get_name().lower().startswith(txt):
-                item.show()
-            else:
-                item.hide()
-
-class ItemWidget(QtWidgets.QWidget):
-
-    def __init__(self, name):
-        super(ItemWidget, self).__init__()
-
-        self.name = name
-
-        self.create_widgets()
-        self.create_ui()
-        self.create_connections()
-
-        self.off_btn_clicked()
-
-    def create_widgets(self):
-        self.label = QtWidgets.QLabel(self.name)
-        self.on_btn = QtWidgets.QPushButton("On")
-        self.off_btn = QtWidgets.QPushButton("Off")
-
-    def create_connections(self):
-        self.on_btn.clicked.connect(self.on_btn_clicked)
-        self.off_btn.clicked.connect(self.off_btn_clicked)
-
-    def create_ui(self):
-        ''' Creates layout and adds widgets'''
-        layout = QtWidgets.QHBoxLayout()
-        layout.addWidget(self.label)
-        layout.addStretch()
-        layout.addWidget(self.on_btn)
-        layout.addWidget(self.off_btn)
-
-        self.setLayout(layout)
-
-    def get_name(self):
-        ''' Public API function '''
-        return self.name
-
-    def on_btn_clicked(self):
-        self.is_on = True
-        self.update_background()
+        ''' Refresh list of items, after typing pauses '''
+        self.filter_timer.start()
+
+    def update_completions(self, text):
+        ''' Ranks completions for typed text, popup is shown again as its rows were replaced '''
+        self.completion_model.set_query(text)
+        if self.completion_model.rowCount():
+            self.completer.complete()
+
+    def completion_activated(self, name):
+        ''' Picked names are offered first next time '''
+        position = self.index.find(name)
+        if position is not None:
+            self.search_index.touch(position)
+
+    def add_item(self, name):
+        '''
+            Adds new switch, indexes are extended instead of being built again
+            Item is hidden when it does not match current filter
+        '''
+        row = self.model.add_switch(name)
+        slot = self.search_index.add(name, row)
 
-    def off_btn_clicked(self):
-        self.is_on = False
-        self.update_background()
+        first, last = self.visible_range
+        if name.lower().startswith(self.filter_text):
+            self.visible_range = (first, last + 1)
+        else:
+            if slot <= first:
+                self.visible_range = (first + 1, last + 1)
+            self.list_view.setRowHidden(row, True)
 
-    def update_background(self):
-        ''' Called after any button is clicked.
+    def apply_filter(self):
+        '''
+            Shows items starting with search text
+            Visible items are always one slice of prefix index, so only difference of old and new slice is touched
+        '''
+        self.filter_text = self.search_input.text().lower()
+        first, last = self.index.get_range(self.filter_text)
+        old_first, old_last = self.visible_range
+        if (first, last) == (old_first, old_last):
+            return
+
+        self.list_view.setUpdatesEnabled(False) # one relayout and repaint for all changes
+        for start, end in subtract_range(old_first, old_last, first, last):
+            for position in self.index.positions[start:end]:
+                self.list_view.setRowHidden(position, True)
+        for start, end in subtract_range(first, last, old_first, old_last):
+            for position in self.index.positions[start:end]:
+                self.list_view.setRowHidden(position, False)
+        self.list_view.setUpdatesEnabled(True)
+
+        self.visible_range = (first, last)
+
+    def switch_selected(self, value):
+        ''' Switches all selected items on/off in one model update '''
+        rows = [row for selection_range in self.list_view.selectionModel().selection()
+                for row in range(selection_range.top(), selection_range.bottom() + 1)]
+        self.model.set_states(rows, value)
+
+    def switch_filtered(self, value):
+        ''' Switches all items matching search text on/off in one model update '''
+        first, last = self.visible_range
+        self.model.set_states(self.index.positions[first:last], value)
+
+    def save_scene(self):
+        ''' Stores state of all items under name, existing scene with same name is replaced '''
+        name, ok = QtWidgets.QInputDialog.getText(self, "Save Scene", "Scene name:", text=self.scene_combo.currentText())
+        if not ok or not name:
+            return
+
+        if name not in self.scenes:
+            self.scene_combo.addItem(name)
+        self.scenes[name] = self.model.get_scene()
+        self.scene_combo.setCurrentText(name)
+        self.update_scene_buttons()
+
+    def apply_scene(self):
+        name = self.scene_combo.currentText()
+        if name in self.scenes:
+            self.model.set_scene(self.scenes[name])
+
+    def update_scene_buttons(self):
+        self.apply_scene_btn.setEnabled(bool(self.scenes))
+
+class SwitchModel(QtCore.QAbstractListModel):
+    '''
+        Names of switches and their state, one byte per switch
+    '''
+    STATE_ROLE = QtCore.Qt.UserRole
+    MAX_SIGNALLED_RUNS = 64 # more scattered changes are announced by one signal spanning all of them
+
+    def __init__(self, names, parent=None):
+        super(SwitchModel, self).__init__(parent)
+
+        self.names = list(names)
+        self.states = bytearray(len(self.names)) # 1 for on, every switch starts off
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.names)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return self.names[index.row()]
+        if role == self.STATE_ROLE:
+            return bool(self.states[index.row()])
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        ''' Switches one item on/off, only its row is repainted '''
+        if not index.isValid() or role != self.STATE_ROLE:
+            return False
+        state = 1 if value else 0
+        if self.states[index.row()] != state:
+            self.states[index.row()] = state
+            self.dataChanged.emit(index, index, [self.STATE_ROLE])
+        return True
+
+    def set_states(self, rows, value):
+        '''
+            Switches many items on/off, rows already in that state are skipped
+            One dataChanged is emitted per run of consecutive changed rows
         '''
-        if self.is_on:
-            self.on_btn.setStyleSheet("background-color: green; color: #fff")
-            self.off_btn.setStyleSheet("background-color: none; color: none")
+        state = 1 if value else 0
+        changed = sorted(row for row in set(rows) if self.states[row] != state)
+        if not changed:
+            return
+
+        for row in changed:
+            self.states[row] = state
+
+        runs = get_runs(changed)
+        if len(runs) > self.MAX_SIGNALLED_RUNS:
+            runs = [(runs[0][0], runs[-1][1])]
+        for first, last in runs:
+            self.dataChanged.emit(self.index(first), self.index(last), [self.STATE_ROLE])
+
+    def get_scene(self):
+        ''' States of all items as bitmap '''
+        return pack_states(self.states)
+
+    def set_scene(self, bitmap):
+        ''' Replaces states of all items by bitmap from get_scene, view repaints once '''
+        self.states = unpack_states(bitmap, len(self.names))
+        if self.states:
+            self.dataChanged.emit(self.index(0), self.index(len(self.states) - 1), [self.STATE_ROLE])
+
+    def add_switch(self, name):
+        ''' Appends switch which is off, returns its row '''
+        row = len(self.names)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self.names.append(name)
+        self.states.append(0)
+        self.endInsertRows()
+        return row
+
+    def get_name(self, row):
+        return self.names[row]
+
+class SwitchDelegate(QtWidgets.QStyledItemDelegate):
+    '''
+        Paints name of switch and its On/Off buttons, clicks on buttons change state in model
+        No widgets are created per row
+    '''
+    ROW_HEIGHT = 28
+    BUTTON_WIDTH = 48
+    MARGIN = 4
+    ON_COLOR = QtGui.QColor('green')
+    OFF_COLOR = QtGui.QColor('red')
+
+    def get_button_rects(self, rect):
+        ''' Returns rectangles of On and Off buttons at right side of row '''
+        off_rect = QtCore.QRect(rect.right() - self.MARGIN - self.BUTTON_WIDTH, rect.top() + self.MARGIN,
+                                self.BUTTON_WIDTH, rect.height() - 2 * self.MARGIN)
+        on_rect = off_rect.translated(-self.BUTTON_WIDTH - self.MARGIN, 0)
+        return on_rect, off_rect
+
+    def paint(self, painter, option, index):
+        painter.save()
+
+        is_selected = option.state & QtWidgets.QStyle.State_Selected
+        if is_selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+
+        on_rect, off_rect = self.get_button_rects(option.rect)
+        text_rect = QtCore.QRect(option.rect.left() + 2 * self.MARGIN, option.rect.top(),
+                                 on_rect.left() - option.rect.left() - 3 * self.MARGIN, option.rect.height())
+        painter.setPen(option.palette.highlightedText().color() if is_selected else option.palette.text().color())
+        painter.drawText(text_rect, QtCore.Qt.AlignVCenter | QtCore.Qt.AlignLeft, index.data())
+
+        is_on = index.data(SwitchModel.STATE_ROLE)
+        self.paint_button(painter, option, on_rect, "On", self.ON_COLOR if is_on else None)
+        self.paint_button(painter, option, off_rect, "Off", None if is_on else self.OFF_COLOR)
+
+        painter.restore()
+
+    def paint_button(self, painter, option, rect, text, color):
+        ''' Active button is filled with its color, inactive one only has frame '''
+        if color:
+            painter.fillRect(rect, color)
+            painter.setPen(QtGui.QColor('#fff'))
         else:
-            self.on_btn.setStyleSheet("background-color: none; color: none")
-            self.off_btn.setStyleSheet("background-color: red; color: #fff")
-
-    def hide(self):
-        ''' Public API function - hides item '''
-        self.set_visible(False)
-
-    def show(self):
-        ''' Public API function - show item '''
-        self.set_visible(True)
-
-    def set_visible(self, is_visible):
-        self.setVisible(is_visible)
-        self.label.setVisible(is_visible)
-        self.on_btn.setVisible(is_visible)
-        self.off_btn.setVisible(is_visible)
+            painter.setPen(option.palette.mid().color())
+            painter.drawRect(rect.adjusted(0, 0, -1, -1))
+            painter.setPen(option.palette.buttonText().color())
+        painter.drawText(rect, QtCore.Qt.AlignCenter, text)
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(200, self.ROW_HEIGHT)
+
+    def editorEvent(self, event, model, option, index):
+        ''' Click on On/Off button switches item '''
+        if event.type() == QtCore.QEvent.MouseButtonRelease and event.button() == QtCore.Qt.LeftButton:
+            on_rect, off_rect = self.get_button_rects(option.rect)
+            if on_rect.contains(event.pos()):
+                return model.setData(index, True, SwitchModel.STATE_ROLE)
+            if off_rect.contains(event.pos()):
+                return model.setData(index, False, SwitchModel.STATE_ROLE)
+        return super(SwitchDelegate, self).editorEvent(event, model, option, index)
 
 if __name__ == '__main__':
     app = QtWidgets.QApplication([])
@@ -6,6 +6,7 @@ from shiboken2 import wrapInstance
 from functools import partial
 
 import maya.cmds as cmds
+import maya.OpenMaya as om
 import maya.OpenMayaUI as omui
 
 
@@ -21,6 +22,13 @@ class SimpleOutliner(QtWidgets.QDialog):
 
     WINDOW_TITLE = "Simple Outliner"
 
+    # icons that differ from Maya's generic ':out_<nodeType>.png' outliner icons
+    NODE_TYPE_ICONS = {
+        "transform": ":transform.svg",
+        "camera": ":Camera.png",
+        "mesh": ":mesh.svg",
+    }
+
     def __init__(self, parent=maya_main_window()):
         super(SimpleOutliner, self).__init__(parent)
 
@@ -33,12 +41,10 @@ class SimpleOutliner(QtWidgets.QDialog):
         self.setMinimumWidth(300)
         
         self.script_job_number = -1  # no script job exists yet
+        self.callback_ids = [] # API callbacks keeping node_types up to date
         
-        self.transform_icon = QtGui.QIcon(":transform.svg")
-        self.camera_icon = QtGui.QIcon(":Camera.png")
-        self.mesh_icon = QtGui.QIcon(":mesh.svg")
-        
-        
+        self.node_types = {} # node name -> node type, filled in bulk in refresh_tree_widget
+        self.icons = {} # node type -> QIcon, created on first use
         
         self.create_actions() # to add items to menu_bar
 
@@ -100,6 +106,7 @@ class SimpleOutliner(QtWidgets.QDialog):
     
     def refresh_tree_widget(self):
         self.shape_nodes = cmds.ls(shapes = True) # list all shapes only
+        self.refresh_node_types()
         self.tree_widget.clear()
         
         top_level_object_names = cmds.ls(assemblies = True) # list all objects in scene (cameras, meshes/shapes)
@@ -137,19 +144,85 @@ class SimpleOutliner(QtWidgets.QDialog):
         else:
             child_count = item.childCount()
             if child_count == 0:
-                object_type = cmds.objectType(item.text(0))
+                object_type = self.get_node_type(item.text(0))
             elif child_count == 1:
                 child_item = item.child(0)
-                object_type = cmds.objectType(child_item.text(0))
+                object_type = self.get_node_type(child_item.text(0))
             else:
                 object_type = "transform"
                 
-            if object_type == "transform":
-                item.setIcon(0, self.transform_icon)
-            elif object_type == "camera":
-                item.setIcon(0, self.camera_icon)
-            elif object_type == "mesh":
-                item.setIcon(0, self.mesh_icon)
+        icon = self.get_icon(object_type)
+        if icon:
+            item.setIcon(0, icon)
+
+    def refresh_node_types(self):
+        """
+        Fills node type cache with one query, 'ls -showType' returns flat list [name, type, name, type, ...]
+        Returns: None
+
+        """
+        names_and_types = cmds.ls(dag=True, showType=True) or []
+        self.node_types = dict(zip(names_and_types[::2], names_and_types[1::2]))
+
+    def get_node_type(self, name):
+        """
+        Returns cached type of node, Maya is asked only for nodes missing in cache
+        Args:
+            name: name of node (string)
+
+        Returns: node type (string)
+
+        """
+        node_type = self.node_types.get(name)
+        if node_type is None and cmds.objExists(name):
+            node_type = cmds.objectType(name)
+            self.node_types[name] = node_type
+
+        return node_type
+
+    def get_icon(self, node_type):
+        """
+        Returns icon for node type, icons are created only once per type
+        Args:
+            node_type: type of node (string)
+
+        Returns: QIcon or None if Maya has no icon for node type
+
+        """
+        if not node_type:
+            return None
+
+        if node_type not in self.icons:
+            path = self.NODE_TYPE_ICONS.get(node_type, ":out_{}.png".format(node_type))
+            if QtCore.QFile.exists(path):
+                self.icons[node_type] = QtGui.QIcon(path)
+            else:
+                self.icons[node_type] = None
+
+        return self.icons[node_type]
+
+    # API callbacks keep node_types valid without asking Maya again
+    def on_node_added(self, node, *args):
+        fn_node = om.MFnDependencyNode(node)
+        self.node_types[fn_node.name()] = fn_node.typeName()
+
+    def on_node_removed(self, node, *args):
+        self.node_types.pop(om.MFnDependencyNode(node).name(), None)
+
+    def on_name_changed(self, node, previous_name, *args):
+        fn_node = om.MFnDependencyNode(node)
+        self.node_types.pop(previous_name, None)
+        self.node_types[fn_node.name()] = fn_node.typeName()
+
+    def set_callbacks_enabled(self, enabled):
+        if enabled and not self.callback_ids:
+            self.callback_ids.append(om.MDGMessage.addNodeAddedCallback(self.on_node_added, "dagNode"))
+            self.callback_ids.append(om.MDGMessage.addNodeRemovedCallback(self.on_node_removed, "dagNode"))
+            self.callback_ids.append(om.MNodeMessage.addNameChangedCallback(om.MObject(), self.on_name_changed)) # null MObject - all nodes
+        elif not enabled and self.callback_ids:
+            for callback_id in self.callback_ids:
+                om.MMessage.removeCallback(callback_id)
+            self.callback_ids = []
             
     def select_items(self):
         items = self.tree_widget.selectedItems()
@@ -205,11 +278,13 @@ class SimpleOutliner(QtWidgets.QDialog):
     def showEvent(self, e):
         super(SimpleOutliner, self).showEvent(e)
         self.set_script_job_enabled(True)
+        self.set_callbacks_enabled(True)
         
     def closeEvent(self, e):
         if isinstance(self, SimpleOutliner):
             super(SimpleOutliner, self).closeEvent(e)
             self.set_script_job_enabled(False)
+            self.set_callbacks_enabled(False)
         
         
 if __name__ == "__main__":
@@ -1,7 +1,17 @@
 from PySide2 import QtCore
+from PySide2 import QtGui
 from PySide2 import QtWidgets
 from shiboken2 import wrapInstance
 
+from collections import defaultdict
+from collections import OrderedDict
+
+import fnmatch
+import operator
+import re
+
+import numpy as np
+
 import maya.OpenMaya as om
 import maya.OpenMayaUI as omui
 import maya.cmds as cmds
@@ -15,12 +25,731 @@ def maya_main_window():
     return wrapInstance(long(main_window_ptr), QtWidgets.QWidget)
 
 
-class TableExampleDialog(QtWidgets.QDialog):
+def get_plug_value(plug):
+    """
+    Reads numeric plug in UI units, same value as cmds.getAttr would return
+    Args:
+        plug: (MPlug)
+
+    Returns: float
+
+    """
+    attribute = plug.attribute()
+    if attribute.hasFn(om.MFn.kUnitAttribute):
+        unit_type = om.MFnUnitAttribute(attribute).unitType()
+        if unit_type == om.MFnUnitAttribute.kDistance:
+            return om.MDistance.internalToUI(plug.asDouble())
+        if unit_type == om.MFnUnitAttribute.kAngle:
+            return om.MAngle.internalToUI(plug.asDouble())
+    return plug.asDouble()
+
+
+def get_attribute_values(nodes, attrs):
+    """
+    Bulk query of numeric attributes, nodes are resolved once through single MSelectionList
+    MSelectionList merges names of the same node, so each row keeps its own selection index
+    Args:
+        nodes: full paths of nodes (list of strings)
+        attrs: attribute names (list of strings)
+
+    Returns: dict attribute name -> numpy array of values, one value per node
+
+    """
+    values = dict((attr, np.zeros(len(nodes), dtype=np.float64)) for attr in attrs)
+
+    selection = om.MSelectionList()
+    selection_rows = [] # selection index -> row
+    merged_rows = [] # rows whose node is already in selection under another name
+    for row, node in enumerate(nodes):
+        length = selection.length()
+        selection.add(node)
+        if selection.length() > length:
+            selection_rows.append(row)
+        else:
+            merged_rows.append(row)
+
+    fn_node = om.MFnDependencyNode()
+    mobject = om.MObject()
+
+    def read_row(row):
+        fn_node.setObject(mobject)
+        for attr in attrs:
+            try:
+                values[attr][row] = get_plug_value(fn_node.findPlug(attr, False))
+            except RuntimeError: # attribute does not exist on this node
+                values[attr][row] = np.nan
+
+    for i, row in enumerate(selection_rows):
+        selection.getDependNode(i, mobject)
+        read_row(row)
+
+    node_selection = om.MSelectionList()
+    for row in merged_rows:
+        node_selection.clear()
+        node_selection.add(nodes[row])
+        node_selection.getDependNode(0, mobject)
+        read_row(row)
+
+    return values
+
+
+class MeshTableModel(QtCore.QAbstractTableModel):
+    """
+    Table of all mesh transforms in the scene
+    Values are stored per column in numpy arrays, text is formatted only for cells the view asks for
+    """
     # to set data to store, UserRole (value 32) is standard for developer usage
     # there are different roles, but you dont want to overwrite them as values there could be important
-    ATTR_ROLE = QtCore.Qt.UserRole 
+    ATTR_ROLE = QtCore.Qt.UserRole
     VALUE_ROLE = QtCore.Qt.UserRole + 1
 
+    VISIBILITY_COLUMN = 0
+    NAME_COLUMN = 1
+
+    DEFAULT_HEADERS = ["", "Name", "TransX", "TransY", "TransZ"]
+    DEFAULT_ATTRS = ["visibility", None, "tx", "ty", "tz"]
+
+    # columns offered in header context menu, any other numeric attribute could be added by name
+    PRESET_COLUMNS = [
+        ("RotX", "rx"), ("RotY", "ry"), ("RotZ", "rz"),
+        ("ScaleX", "sx"), ("ScaleY", "sy"), ("ScaleZ", "sz"),
+    ]
+
+    def __init__(self, parent=None):
+        super(MeshTableModel, self).__init__(parent)
+
+        self.headers = list(self.DEFAULT_HEADERS)
+        self.attrs = list(self.DEFAULT_ATTRS)
+
+        self.nodes = [] # full paths of transforms
+        self.values = {} # attribute name -> numpy array
+
+        self.callback_ids = {} # row -> attribute changed callback, only for rows visible in the view
+        self.dirty_rows = set() # rows changed in Maya, re-read together on next event loop tick
+
+    def refresh(self):
+        """
+        Reloads whole content of the table with one bulk scene query
+        Returns: None
+
+        """
+        self.set_watched_rows([]) # rows are about to change
+        self.beginResetModel()
+
+        meshes = cmds.ls(type="mesh", long=True)
+        self.nodes = []
+        if meshes:
+            # one call for all meshes, transform with more mesh shapes is listed once
+            self.nodes = list(OrderedDict.fromkeys(cmds.listRelatives(meshes, parent=True, fullPath=True) or []))
+        self.values = get_attribute_values(self.nodes, [attr for attr in self.attrs if attr])
+
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.nodes)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return self.headers[section]
+        return section + 1 # row numbers
+
+    def flags(self, index):
+        if index.column() == self.VISIBILITY_COLUMN:
+            return QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemIsEnabled
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEditable
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        column = index.column()
+        attr = self.attrs[column]
+
+        if role == self.ATTR_ROLE:
+            return attr
+
+        if column == self.NAME_COLUMN:
+            if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+                return self.get_short_name(row)
+            if role == self.VALUE_ROLE:
+                return self.nodes[row]
+            return None
+
+        value = self.values[attr][row]
+        if column == self.VISIBILITY_COLUMN:
+            if role == QtCore.Qt.CheckStateRole:
+                return QtCore.Qt.Checked if value else QtCore.Qt.Unchecked
+        elif role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            if np.isnan(value): # node does not have this attribute
+                return ""
+            return self.float_to_string(value)
+
+        if role == self.VALUE_ROLE:
+            return float(value)
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        """
+        Called when value is changed in the table, pushes it to Maya
+        Returns: True if Maya accepted new value
+
+        """
+        if not index.isValid():
+            return False
+
+        row = index.row()
+        column = index.column()
+
+        if column == self.NAME_COLUMN:
+            if role != QtCore.Qt.EditRole:
+                return False
+            return self.rename(row, value)
+
+        if column == self.VISIBILITY_COLUMN:
+            if role != QtCore.Qt.CheckStateRole:
+                return False
+            value = value == QtCore.Qt.Checked
+        elif role != QtCore.Qt.EditRole:
+            return False
+
+        return self.set_values([index], [value])
+
+    def rename(self, row, new_name):
+        """
+        Rename node in Maya, Maya follows special naming convention 'My Name' >> 'My_Name'
+        Returns: True if node was renamed
+
+        """
+        old_path = self.nodes[row]
+        if not new_name or new_name == self.get_short_name(row):
+            return False
+
+        try:
+            actual_new_name = cmds.rename(old_path, new_name) # tell Maya to rename mesh
+        except RuntimeError:
+            return False
+
+        self.nodes[row] = "{}|{}".format(old_path.rsplit("|", 1)[0], actual_new_name)
+        index = self.index(row, self.NAME_COLUMN)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def set_values(self, indexes, values):
+        """
+        Writes many cells to Maya in one batched pass inside a single undo chunk
+        Cells Maya refuses (eg. locked or connected attribute) are skipped and reported in one warning
+        Stored values are read back in bulk afterwards as Maya could clamp them
+        Args:
+            indexes: cells to change, name column is skipped (list of QModelIndex)
+            values: new values, one per index (list of floats or strings)
+
+        Returns: True if all values were set
+
+        """
+        changes = defaultdict(dict) # column -> {row: value}, last value wins for duplicate cells
+        for index, value in zip(indexes, values):
+            if index.isValid() and index.column() != self.NAME_COLUMN:
+                try:
+                    changes[index.column()][index.row()] = float(value)
+                except ValueError: # cast error, nothing is written
+                    om.MGlobal.displayWarning("Table Example: '{}' is not a number, nothing was set".format(value))
+                    return False
+
+        if not changes:
+            return False
+
+        skipped = [] # full attribute names Maya did not accept
+        cmds.undoInfo(openChunk=True, chunkName="tableExampleSetValues") # whole edit is undone at once
+        try:
+            for column, row_values in changes.items():
+                attr = self.attrs[column]
+                for row, value in row_values.items():
+                    try:
+                        cmds.setAttr(self.get_full_attr_name(row, attr), value)
+                    except Exception: # attribute update error, eg. locked attribute, other cells are still set
+                        skipped.append(self.get_full_attr_name(row, attr))
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+        if skipped:
+            om.MGlobal.displayWarning("Table Example: {} of {} cells were not set (locked or connected): {}".format(
+                len(skipped), sum(len(row_values) for row_values in changes.values()), ", ".join(skipped)))
+
+        for column, row_values in changes.items():
+            attr = self.attrs[column]
+            rows = np.fromiter(row_values.keys(), dtype=np.int64, count=len(row_values))
+            self.values[attr][rows] = get_attribute_values([self.nodes[row] for row in rows], [attr])[attr]
+            self.dataChanged.emit(self.index(int(rows.min()), column), self.index(int(rows.max()), column))
+
+        return not skipped
+
+    def update_selected_values(self, indexes, operation):
+        """
+        Applies operation on current values of selected numeric cells, column by column
+        Args:
+            indexes: selected cells in order as shown in the view (list of QModelIndex)
+            operation: function(numpy array of values, top cell first) -> numpy array of new values
+
+        Returns: True if all values were set
+
+        """
+        rows_by_column = defaultdict(list)
+        for index in indexes:
+            if self.is_numeric_column(index.column()):
+                rows_by_column[index.column()].append(index.row())
+
+        changed_indexes = []
+        new_values = []
+        for column, rows in rows_by_column.items():
+            rows = np.array(list(OrderedDict.fromkeys(rows)), dtype=np.int64) # unique, keeps view order
+            values = operation(self.values[self.attrs[column]][rows])
+            changed_indexes.extend(self.index(int(row), column) for row in rows)
+            new_values.extend(values)
+
+        return self.set_values(changed_indexes, new_values)
+
+    def fill_down(self, indexes):
+        return self.update_selected_values(indexes, lambda values: np.full_like(values, values[0]))
+
+    def offset_values(self, indexes, offset):
+        return self.update_selected_values(indexes, lambda values: values + offset)
+
+    def scale_values(self, indexes, factor):
+        return self.update_selected_values(indexes, lambda values: values * factor)
+
+    def is_numeric_column(self, column):
+        return column not in (self.VISIBILITY_COLUMN, self.NAME_COLUMN)
+
+    def add_column(self, attr, header=None):
+        """
+        Adds column of numeric attribute, only the new attribute is queried from the scene
+        Args:
+            attr: attribute name (string)
+            header: column title, attribute name is used if not set (string)
+
+        Returns: True if column was added
+
+        """
+        if not attr or attr in self.attrs:
+            return False
+
+        column = len(self.attrs)
+        self.beginInsertColumns(QtCore.QModelIndex(), column, column)
+        self.headers.append(header or attr)
+        self.attrs.append(attr)
+        self.values.update(get_attribute_values(self.nodes, [attr]))
+        self.endInsertColumns()
+        return True
+
+    def remove_column(self, column):
+        """
+        Removes attribute column, visibility and name columns are always shown
+        Returns: True if column was removed
+
+        """
+        if column < 0 or column >= len(self.attrs) or not self.is_numeric_column(column):
+            return False
+
+        self.beginRemoveColumns(QtCore.QModelIndex(), column, column)
+        self.headers.pop(column)
+        self.values.pop(self.attrs.pop(column), None)
+        self.endRemoveColumns()
+        return True
+
+    def set_watched_rows(self, rows):
+        """
+        Keeps attribute changed callbacks only for given rows, callbacks of other rows are removed
+        Args:
+            rows: rows shown in the view (iterable of ints)
+
+        Returns: None
+
+        """
+        rows = set(rows)
+        for row in set(self.callback_ids) - rows:
+            om.MMessage.removeCallback(self.callback_ids.pop(row))
+
+        new_rows = sorted(rows - set(self.callback_ids))
+        if not new_rows:
+            return
+
+        selection = om.MSelectionList()
+        for row in new_rows:
+            selection.add(self.nodes[row])
+
+        mobject = om.MObject()
+        for i, row in enumerate(new_rows):
+            selection.getDependNode(i, mobject)
+            self.callback_ids[row] = om.MNodeMessage.addAttributeChangedCallback(mobject, self.on_attribute_changed, row)
+
+    def on_attribute_changed(self, message, plug, other_plug, row):
+        """ Called by Maya for watched rows, rows are re-read later in one batch """
+        if not message & om.MNodeMessage.kAttributeSet:
+            return
+
+        if not self.dirty_rows:
+            QtCore.QTimer.singleShot(0, self.update_dirty_rows)
+        self.dirty_rows.add(row)
+
+    def update_dirty_rows(self):
+        """
+        Re-reads all columns of rows changed in Maya, updates only their cells
+        Returns: None
+
+        """
+        rows = sorted(row for row in self.dirty_rows if row < len(self.nodes))
+        self.dirty_rows = set()
+        if not rows:
+            return
+
+        attrs = [attr for attr in self.attrs if attr]
+        for attr, values in get_attribute_values([self.nodes[row] for row in rows], attrs).items():
+            self.values[attr][rows] = values
+
+        last_column = self.columnCount() - 1
+        for row in rows:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+
+    def get_short_name(self, row):
+        return self.nodes[row].rsplit("|", 1)[-1]
+
+    # get Maya object name to use cmds. properly
+    def get_full_attr_name(self, row, attr):
+        return "{}.{}".format(self.nodes[row], attr)
+
+    # nicer formation of translations
+    def float_to_string(self, value):
+        return "{0:.4f}".format(value)
+
+
+class FilterExpression(object):
+    """
+    Filter like 'ty < 0 and name ~ "rock*"' compiled into function returning boolean mask over whole columns
+    Supports <, <=, >, >=, ==, !=, ~ (wildcard match), and, or, not and parentheses
+    Raises ValueError for invalid expression
+    """
+    TOKEN_RE = re.compile(r"""\s*(?:
+        (?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?![\w*?]))
+        |(?P<string>"[^"]*"|'[^']*')
+        |(?P<op><=|>=|==|!=|<|>|=|~)
+        |(?P<paren>[()])
+        |(?P<word>[^\s()<>=!~"']+)
+        )""", re.VERBOSE)
+
+    OPERATORS = {
+        "<": operator.lt,
+        "<=": operator.le,
+        ">": operator.gt,
+        ">=": operator.ge,
+        "=": operator.eq,
+        "==": operator.eq,
+        "!=": operator.ne,
+    }
+
+    def __init__(self, text):
+        self.tokens = self.tokenize(text)
+        self.position = 0
+
+        self.evaluate = self.parse_or() # function(get_column) -> numpy bool array
+        if self.position < len(self.tokens):
+            raise ValueError("Unexpected '{}'".format(self.tokens[self.position][1]))
+
+    def tokenize(self, text):
+        tokens = []
+        text = text.strip()
+        position = 0
+        while position < len(text):
+            match = self.TOKEN_RE.match(text, position)
+            if not match:
+                raise ValueError("Unexpected character '{}'".format(text[position]))
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+        return tokens
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def next_token(self):
+        if self.position >= len(self.tokens):
+            raise ValueError("Unexpected end of filter")
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def accept_keyword(self, keyword):
+        kind, value = self.peek()
+        if kind == "word" and value.lower() == keyword:
+            self.position += 1
+            return True
+        return False
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.accept_keyword("or"):
+            operands.append(self.parse_and())
+
+        if len(operands) == 1:
+            return operands[0]
+        return lambda get_column: np.logical_or.reduce([operand(get_column) for operand in operands])
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.accept_keyword("and"):
+            operands.append(self.parse_not())
+
+        if len(operands) == 1:
+            return operands[0]
+        return lambda get_column: np.logical_and.reduce([operand(get_column) for operand in operands])
+
+    def parse_not(self):
+        if self.accept_keyword("not"):
+            operand = self.parse_not()
+            return lambda get_column: np.logical_not(operand(get_column))
+
+        if self.peek() == ("paren", "("):
+            self.next_token()
+            operand = self.parse_or()
+            if self.next_token() != ("paren", ")"):
+                raise ValueError("Missing ')'")
+            return operand
+
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        kind, field = self.next_token()
+        if kind != "word":
+            raise ValueError("Expected column name, got '{}'".format(field))
+
+        kind, op = self.next_token()
+        if kind != "op":
+            raise ValueError("Expected operator after '{}'".format(field))
+
+        kind, value = self.next_token()
+        if kind == "string":
+            value = value[1:-1]
+        elif kind not in ("number", "word"):
+            raise ValueError("Expected value after '{} {}'".format(field, op))
+
+        if op == "~":
+            pattern = re.compile(fnmatch.translate(value), re.IGNORECASE)
+
+            def compare(get_column):
+                column = get_column(field)
+                return np.fromiter((pattern.match(str(item)) is not None for item in column), dtype=bool, count=len(column))
+        else:
+            function = self.OPERATORS[op]
+
+            def compare(get_column):
+                column = get_column(field)
+                if column.dtype.kind == "f":
+                    try:
+                        return function(column, float(value))
+                    except ValueError:
+                        raise ValueError("Column '{}' is numeric, '{}' is not a number".format(field, value))
+                return function(column, value)
+
+        return compare
+
+
+class MeshFilterProxyModel(QtCore.QAbstractProxyModel):
+    """
+    Sorted and filtered view of MeshTableModel
+    Proxy index is numpy array of source rows, computed by vectorized comparisons over model columns
+    """
+    def __init__(self, parent=None):
+        super(MeshFilterProxyModel, self).__init__(parent)
+
+        self.order = np.zeros(0, dtype=np.int64) # proxy row -> source row
+        self.proxy_rows = np.zeros(0, dtype=np.int64) # source row -> proxy row, -1 if filtered out
+        self.names = None # numpy array of short names, created when filter or sort needs it
+
+        self.filter_expression = None
+        self.sort_column = -1
+        self.sort_order = QtCore.Qt.AscendingOrder
+
+    def setSourceModel(self, model):
+        super(MeshFilterProxyModel, self).setSourceModel(model)
+
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self.on_source_reset)
+        model.dataChanged.connect(self.on_source_data_changed)
+        model.columnsAboutToBeInserted.connect(lambda parent, first, last: self.beginInsertColumns(QtCore.QModelIndex(), first, last))
+        model.columnsInserted.connect(self.endInsertColumns)
+        model.columnsAboutToBeRemoved.connect(self.on_source_columns_about_to_be_removed)
+        model.columnsRemoved.connect(self.endRemoveColumns)
+
+        self.beginResetModel()
+        self.on_source_reset()
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not 0 <= row < len(self.order) or not 0 <= column < self.columnCount():
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None: # QObject.parent()
+            return QtCore.QObject.parent(self)
+        return QtCore.QModelIndex()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.order)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not self.sourceModel():
+            return 0
+        return self.sourceModel().columnCount()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """ Columns are not filtered, rows show header of their source row """
+        model = self.sourceModel()
+        if not model:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return model.headerData(section, orientation, role)
+        if 0 <= section < len(self.order):
+            return model.headerData(int(self.order[section]), orientation, role)
+        return None
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QtCore.QModelIndex()
+        return self.sourceModel().index(int(self.order[proxy_index.row()]), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QtCore.QModelIndex()
+        row = self.proxy_rows[source_index.row()]
+        if row < 0:
+            return QtCore.QModelIndex()
+        return self.index(int(row), source_index.column())
+
+    def get_source_rows(self, first_row, last_row):
+        """ Source rows of proxy rows first_row..last_row (inclusive) """
+        return self.order[first_row:last_row + 1].tolist()
+
+    def set_filter_text(self, text):
+        """
+        Applies filter, empty text shows all rows
+        Raises ValueError for invalid filter, previous filter is kept in that case
+        Returns: None
+
+        """
+        filter_expression = FilterExpression(text) if text.strip() else None
+        if filter_expression:
+            filter_expression.evaluate(self.get_column) # validates column names and values before any change
+
+        self.beginResetModel()
+        self.filter_expression = filter_expression
+        self.update_order()
+        self.endResetModel()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        self.beginResetModel()
+        self.sort_column = column
+        self.sort_order = order
+        self.update_order()
+        self.endResetModel()
+
+    def update_order(self):
+        """
+        Recomputes proxy index from current filter and sort column, no data is copied from Maya
+        Returns: None
+
+        """
+        row_count = self.sourceModel().rowCount()
+        if self.filter_expression:
+            rows = np.flatnonzero(self.filter_expression.evaluate(self.get_column))
+        else:
+            rows = np.arange(row_count, dtype=np.int64)
+
+        if 0 <= self.sort_column < self.columnCount():
+            keys = self.get_column_by_index(self.sort_column)[rows]
+            sorted_rows = np.argsort(keys, kind="mergesort") # stable, equal values keep scene order
+            if self.sort_order == QtCore.Qt.DescendingOrder:
+                sorted_rows = sorted_rows[::-1]
+            rows = rows[sorted_rows]
+
+        self.order = rows.astype(np.int64)
+        self.proxy_rows = np.full(row_count, -1, dtype=np.int64)
+        self.proxy_rows[self.order] = np.arange(len(self.order), dtype=np.int64)
+
+    def get_column(self, field):
+        """
+        Returns whole column of source model, field could be 'name', attribute or header name
+        Raises ValueError for unknown field
+        Returns: numpy array
+
+        """
+        model = self.sourceModel()
+        field = field.lower()
+        for column in range(model.columnCount()):
+            attr = model.attrs[column]
+            if field in ((attr or "name").lower(), model.headers[column].lower()):
+                return self.get_column_by_index(column)
+
+        raise ValueError("Unknown column '{}'".format(field))
+
+    def get_column_by_index(self, column):
+        model = self.sourceModel()
+        if column == model.NAME_COLUMN:
+            if self.names is None:
+                self.names = np.array([model.get_short_name(row) for row in range(model.rowCount())], dtype="U")
+            return self.names
+        return model.values[model.attrs[column]]
+
+    def on_source_reset(self):
+        """ Source rows changed, filter and sort are applied again """
+        self.names = None
+        self.update_order()
+        self.endResetModel()
+
+    def on_source_data_changed(self, top_left, bottom_right, roles=[]):
+        """ Forwards changed cells which pass the filter, values are not filtered or sorted again until next change of filter """
+        if top_left.column() <= self.sourceModel().NAME_COLUMN <= bottom_right.column():
+            self.names = None # renamed node
+
+        rows = self.proxy_rows[top_left.row():bottom_right.row() + 1]
+        rows = rows[rows >= 0]
+        if len(rows):
+            self.dataChanged.emit(self.index(int(rows.min()), top_left.column()), self.index(int(rows.max()), bottom_right.column()))
+
+    def on_source_columns_about_to_be_removed(self, parent, first, last):
+        if first <= self.sort_column <= last:
+            self.sort_column = -1
+        elif self.sort_column > last:
+            self.sort_column -= last - first + 1
+        self.beginRemoveColumns(QtCore.QModelIndex(), first, last)
+
+
+class MultiCellDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    Value typed into one of selected cells is written to all selected cells of the same column
+    """
+    def setModelData(self, editor, model, index):
+        selection_model = self.parent().selectionModel()
+        indexes = [selected for selected in selection_model.selectedIndexes() if selected.column() == index.column()]
+
+        if index.column() == MeshTableModel.NAME_COLUMN or len(indexes) < 2 or index not in indexes:
+            super(MultiCellDelegate, self).setModelData(editor, model, index)
+        else:
+            source_indexes = [model.mapToSource(selected) for selected in indexes] # view shows filter proxy
+            model.sourceModel().set_values(source_indexes, [editor.text()] * len(indexes))
+
+
+class TableExampleDialog(QtWidgets.QDialog):
+
     def __init__(self, parent=maya_main_window()):
         super(TableExampleDialog, self).__init__(parent)
 
@@ -28,28 +757,62 @@ class TableExampleDialog(QtWidgets.QDialog):
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowContextHelpButtonHint)
         self.setMinimumWidth(500)
 
+        self.create_actions()
         self.create_widgets()
         self.create_layout()
         self.create_connections()
 
+    def create_actions(self):
+        """
+        Batch operations over selected TransX/Y/Z cells, available in context menu
+        Returns: None
+
+        """
+        self.fill_down_action = QtWidgets.QAction("Fill Down", self)
+        self.fill_down_action.setShortcut(QtGui.QKeySequence("Ctrl+D"))
+        self.offset_action = QtWidgets.QAction("Offset...", self)
+        self.scale_action = QtWidgets.QAction("Scale...", self)
+        self.paste_action = QtWidgets.QAction("Paste", self)
+        self.paste_action.setShortcut(QtGui.QKeySequence.Paste)
+
+        self.addAction(self.fill_down_action) # shortcuts work also outside of context menu
+        self.addAction(self.paste_action)
+
     def create_widgets(self):
         """
         Creates all widgets
         Returns: None
 
         """
-        self.table_wdg = QtWidgets.QTableWidget()
-        self.table_wdg.setColumnCount(5)
-        self.table_wdg.setColumnWidth(0, 22)
-        self.table_wdg.setColumnWidth(2, 70)
-        self.table_wdg.setColumnWidth(3, 70)
-        self.table_wdg.setColumnWidth(4, 70)
-        
-        self.table_wdg.setHorizontalHeaderLabels(["", "Name", "TransX", "TransY", "TransZ"])
-        header_view = self.table_wdg.horizontalHeader()
+        self.table_model = MeshTableModel(self)
+        self.filter_model = MeshFilterProxyModel(self)
+        self.filter_model.setSourceModel(self.table_model)
+
+        self.filter_le = QtWidgets.QLineEdit()
+        self.filter_le.setPlaceholderText('Filter, eg. ty < 0 and name ~ "rock*"')
+        self.filter_status_lbl = QtWidgets.QLabel()
+
+        self.filter_timer = QtCore.QTimer(self) # filter is applied once user stops typing
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+
+        self.table_view = QtWidgets.QTableView()
+        self.table_view.setModel(self.filter_model)
+        self.table_view.horizontalHeader().setSortIndicator(-1, QtCore.Qt.AscendingOrder) # scene order until header is clicked
+        self.table_view.setSortingEnabled(True)
+        self.table_view.setItemDelegate(MultiCellDelegate(self.table_view))
+        self.table_view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.table_view.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self.table_view.verticalHeader().setDefaultSectionSize(20) # fixed row height, view does not measure each row
+        self.table_view.setColumnWidth(0, 22)
+        self.table_view.setColumnWidth(2, 70)
+        self.table_view.setColumnWidth(3, 70)
+        self.table_view.setColumnWidth(4, 70)
+
+        header_view = self.table_view.horizontalHeader()
         header_view.setSectionResizeMode(1, QtWidgets.QHeaderView.Stretch)
+        header_view.setContextMenuPolicy(QtCore.Qt.CustomContextMenu) # add/remove attribute columns
 
-        
         self.refresh_btn = QtWidgets.QPushButton("Refresh")
         self.close_btn = QtWidgets.QPushButton("Close")
 
@@ -68,42 +831,57 @@ class TableExampleDialog(QtWidgets.QDialog):
         main_layout = QtWidgets.QVBoxLayout(self)
         main_layout.setContentsMargins(2, 2, 2, 2)
         main_layout.setSpacing(2)
-        
-        main_layout.addWidget(self.table_wdg)
-        
+
+        filter_layout = QtWidgets.QHBoxLayout()
+        filter_layout.setSpacing(4)
+        filter_layout.addWidget(self.filter_le)
+        filter_layout.addWidget(self.filter_status_lbl)
+
+        main_layout.addLayout(filter_layout)
+        main_layout.addWidget(self.table_view)
+
         main_layout.addStretch()
         main_layout.addLayout(button_layout)
 
     def create_connections(self):
         """
         All connection from widgets to callbacks
+        Edits are handled by MeshTableModel.setData, no cellChanged signal to block while refreshing
         Returns: None
 
         """
-        self.set_cell_changed_connection_enabled(True)
-        #self.table_wdg.cellChanged.connect(self.on_cell_changed) #produces 1 event for each cell!!!
         self.refresh_btn.clicked.connect(self.refresh_table)
         self.close_btn.clicked.connect(self.close)
 
-    def set_cell_changed_connection_enabled(self, enabled):
-        """
-        Without this function events would be trigered for every cell
-        Args:
-            enabled: boolean
+        self.table_view.customContextMenuRequested.connect(self.show_context_menu)
+        self.fill_down_action.triggered.connect(self.fill_down)
+        self.offset_action.triggered.connect(self.offset_values)
+        self.scale_action.triggered.connect(self.scale_values)
+        self.paste_action.triggered.connect(self.paste_from_clipboard)
 
-        Returns: None
+        self.table_view.horizontalHeader().customContextMenuRequested.connect(self.show_header_context_menu)
 
-        """
-        if enabled:
-            self.table_wdg.cellChanged.connect(self.on_cell_changed)
-        else:
-            self.table_wdg.cellChanged.disconnect(self.on_cell_changed)
-    
-    #override existing method to call refresh_table automaticaly at each start of dialog    
+        # only rows in the viewport are synchronized with the scene
+        self.table_view.verticalScrollBar().valueChanged.connect(self.update_watched_rows)
+        self.filter_model.modelReset.connect(self.update_watched_rows)
+
+        self.filter_le.textChanged.connect(self.filter_timer.start)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_model.modelReset.connect(self.update_filter_status)
+
+    #override existing method to call refresh_table automaticaly at each start of dialog
     def showEvent(self, e):
         super(TableExampleDialog, self).showEvent(e)
         self.refresh_table()
 
+    def closeEvent(self, e):
+        super(TableExampleDialog, self).closeEvent(e)
+        self.table_model.set_watched_rows([]) # no callbacks while dialog is closed
+
+    def resizeEvent(self, e):
+        super(TableExampleDialog, self).resizeEvent(e)
+        self.update_watched_rows()
+
     #override
     def keyPressEvent(self, e):
         super(TableExampleDialog, self).keyPressEvent(e) #do key press event for dialog
@@ -115,173 +893,122 @@ class TableExampleDialog(QtWidgets.QDialog):
         Returns: None
 
         """
-        self.set_cell_changed_connection_enabled(False) #limits triggering separete events for change per each cell
-        self.table_wdg.setRowCount(0) #purge table
-        
-        meshes = cmds.ls(type="mesh")
-        for i in range(len(meshes)):
-            transform_name = cmds.listRelatives(meshes[i], parent=True)[0] #mesh name
-            translation = cmds.getAttr("{}.translate".format(transform_name))[0]
-            visible = cmds.getAttr("{}.visibility".format(transform_name))         
-            
-            self.table_wdg.insertRow(i)
-            self.insert_item(i, 0, "", "visibility", visible, True)
-            self.insert_item(i, 1, transform_name, None, transform_name, False)
-            self.insert_item(i, 2, self.float_to_string(translation[0]), "tx", translation[0], False) # value for x
-            self.insert_item(i, 3, self.float_to_string(translation[1]), "ty", translation[1], False) # value for y
-            self.insert_item(i, 4, self.float_to_string(translation[2]), "tz", translation[2], False) # value for z  
-            
-        self.set_cell_changed_connection_enabled(True)  # enable regular event spawning                 
-            
-    def insert_item(self, row, column, text, attr, value, is_boolean):
-        """
-        Insert new item to the table
-        Args:
-            row: index of row (int)
-            column: index of columnt (int)
-            text: content of cell (string)
-            attr: name of attribute (string)
-            value: value of attribute (string
-            is_boolean: is attribute boolean
-
+        self.table_model.refresh()
+
+    def show_context_menu(self, point):
+        context_menu = QtWidgets.QMenu()
+        context_menu.addAction(self.paste_action)
+        context_menu.addSeparator()
+        context_menu.addAction(self.fill_down_action)
+        context_menu.addAction(self.offset_action)
+        context_menu.addAction(self.scale_action)
+
+        context_menu.exec_(self.table_view.viewport().mapToGlobal(point)) # point is relative to viewport
+
+    def show_header_context_menu(self, point):
+        header_view = self.table_view.horizontalHeader()
+        column = header_view.logicalIndexAt(point)
+
+        context_menu = QtWidgets.QMenu()
+        add_menu = context_menu.addMenu("Add Column")
+        for header, attr in self.table_model.PRESET_COLUMNS:
+            action = add_menu.addAction(header)
+            action.setData(attr)
+            action.setEnabled(attr not in self.table_model.attrs)
+        add_menu.addSeparator()
+        other_action = add_menu.addAction("Other Attribute...")
+
+        remove_action = context_menu.addAction("Remove Column")
+        remove_action.setEnabled(column >= 0 and self.table_model.is_numeric_column(column))
+
+        action = context_menu.exec_(header_view.mapToGlobal(point))
+        if action == remove_action:
+            self.table_model.remove_column(column)
+        elif action == other_action:
+            self.add_attribute_column()
+        elif action:
+            self.table_model.add_column(action.data(), action.text())
+
+    def add_attribute_column(self):
+        attr, ok = QtWidgets.QInputDialog.getText(self, "Add Column", "Numeric attribute name:")
+        if ok:
+            self.table_model.add_column(attr.strip())
+
+    def update_watched_rows(self):
+        """
+        Registers Maya callbacks only for rows currently visible in the viewport
         Returns: None
 
         """
-        item = QtWidgets.QTableWidgetItem(text)
-        self.set_item_attr(item, attr)
-        self.set_item_value(item, value)
-        if is_boolean:
-            item.setFlags(QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemIsEnabled)
-            self.set_item_checked(item, value)
-        
-        self.table_wdg.setItem(row, column, item)
-     
-    def on_cell_changed(self, row, column):
-        """
-        Called when value is changed in the table
-        Args:
-            row: index of row (int)
-            column: index of column (int)
+        row_count = self.table_model.rowCount()
+        first_row = self.table_view.rowAt(0)
+        if not self.isVisible() or row_count == 0 or first_row < 0:
+            self.table_model.set_watched_rows([])
+            return
 
-        Returns: None
+        last_row = self.table_view.rowAt(self.table_view.viewport().height() - 1)
+        if last_row < 0: # table ends before bottom of viewport
+            last_row = row_count - 1
 
-        """
-        self.set_cell_changed_connection_enabled(False) # see refresh table
-        
-        item = self.table_wdg.item(row, column)
-        if column == 1:
-            self.rename(item)
-        else:
-            is_boolean = column == 0
-            self.update_attr(self.get_full_attr_name(row, item), item, is_boolean )
-        
-        self.set_cell_changed_connection_enabled(True)
+        self.table_model.set_watched_rows(self.filter_model.get_source_rows(first_row, last_row))
 
-    def rename(self, item):
-        """
-        Update value in column 1, eg. name
-        Args:
-            item: (Item)
+    def apply_filter(self):
+        try:
+            self.filter_model.set_filter_text(self.filter_le.text())
+        except ValueError as e: # invalid or unfinished expression, previous filter stays
+            self.filter_status_lbl.setText(str(e))
 
-        Returns: None
+    def update_filter_status(self):
+        self.filter_status_lbl.setText("{} of {}".format(self.filter_model.rowCount(), self.table_model.rowCount()))
 
-        """
-        old_name = self.get_item_value(item)
-        new_name = self.get_item_text(item)
-        
-        if old_name != new_name:
-            actual_new_name = cmds.rename(old_name, new_name) # tell Maya to rename mesh
-            if actual_new_name != new_name: # Maya follows special naming convention 'My Name' >> 'My_Name'
-                self.set_item_text(item, actual_new_name)
-                
-            self.set_item_value(item, actual_new_name)
+    def get_selected_indexes(self):
+        """ Source model indexes of selected cells, in order as shown in the view """
+        selected = sorted(self.table_view.selectionModel().selectedIndexes(), key=lambda index: (index.row(), index.column()))
+        return [self.filter_model.mapToSource(index) for index in selected]
 
-    def update_attr(self, attr_name, item, is_boolean):
-        """
-        update value in a cell via cmds
-        Args:
-            attr_name: attribute name (string)
-            item: whole item (Item)
-            is_boolean: is attribute boolean
+    def fill_down(self):
+        """ Copies top selected value to all selected cells below it, per column """
+        self.table_model.fill_down(self.get_selected_indexes())
+
+    def offset_values(self):
+        offset, ok = QtWidgets.QInputDialog.getDouble(self, "Offset", "Add to selected values:", 0.0, decimals=4)
+        if ok:
+            self.table_model.offset_values(self.get_selected_indexes(), offset)
+
+    def scale_values(self):
+        factor, ok = QtWidgets.QInputDialog.getDouble(self, "Scale", "Multiply selected values by:", 1.0, decimals=4)
+        if ok:
+            self.table_model.scale_values(self.get_selected_indexes(), factor)
 
+    def paste_from_clipboard(self):
+        """
+        Pastes tab separated range (eg. copied from spreadsheet) starting at top left selected cell
+        Single value is pasted into every selected cell
         Returns: None
 
         """
-        if is_boolean:
-            value = self.is_item_checked(item)
-            self.set_item_text(item, "")
-        else:
-            text = self.get_item_text(item)
-            try:
-                value = float(text)
-            except ValueError as e: # cast error
-                print("exception {}".format(e))
-                self.revert_original_value(item, is_boolean)
-                return
-                
-        try:
-            cmds.setAttr(attr_name, value)
-        except Exception as e: # attribute update error
-            self.revert_original_value(item, is_boolean)
+        selected = self.table_view.selectionModel().selectedIndexes()
+        lines = [line.split("\t") for line in QtWidgets.QApplication.clipboard().text().splitlines() if line]
+        if not selected or not lines:
             return
-            
-        new_value = cmds.getAttr(attr_name)
-        if is_boolean:
-            self.set_item_checked(item, new_value)
-        else:
-            self.set_item_text(item, self.float_to_string(new_value))
-            
-        self.set_item_value(item, new_value)
-        
-    # helper methods to make item creation easier    
-    def set_item_text(self, item, text):
-        item.setText(text)
-        
-    def get_item_text(self, item):
-        return item.text()
-        
-    def set_item_checked(self, item, checked):
-        if checked:
-            item.setCheckState(QtCore.Qt.Checked)
-        else:
-            item.setCheckState(QtCore.Qt.Unchecked)
-            
-    def is_item_checked(self, item):
-        return item.checkState() == QtCore.Qt.Checked
-        
-    #set attribute name
-    def set_item_attr(self, item, attr):
-        item.setData(self.ATTR_ROLE, attr)
-        
-    # get name of attribute
-    def get_item_attr(self, item):
-        return item.data(self.ATTR_ROLE)
-                
-    # set value - see different stores ATTR_ROLE vs VALUE_ROLE
-    # there could be only 1 value (could be array) stored there
-    def set_item_value(self, item, value):
-        item.setData(self.VALUE_ROLE, value)
-        
-    def get_item_value(self, item):
-        return item.data(self.VALUE_ROLE)
-        
-    # nicer formation of translations
-    def float_to_string(self, value):
-        return "{0:.4f}".format(value)
 
-    # used in case of exception, cast of wrong value etc
-    def revert_original_value(self, item, is_boolean):
-        original_value = self.get_item_value(item)
-        if is_boolean:
-            self.set_item_checked(item, original_value)
-        else:
-            self.float_to_string(original_value)
-     
-    # get Maya object name to use cmds. properly        
-    def get_full_attr_name(self, row, item):
-        node_name = self.table_wdg.item(row, 1).data(self.VALUE_ROLE)
-        attr_name = self.get_item_attr(item)
-        return "{}.{}".format(node_name, attr_name)
+        if len(lines) == 1 and len(lines[0]) == 1:
+            self.table_model.set_values(self.get_selected_indexes(), lines[0] * len(selected))
+            return
+
+        top_row = min(index.row() for index in selected)
+        left_column = min(index.column() for index in selected)
+
+        indexes = []
+        values = []
+        for row_offset, line in enumerate(lines):
+            for column_offset, text in enumerate(line):
+                index = self.filter_model.index(top_row + row_offset, left_column + column_offset)
+                if index.isValid(): # range is clipped by table size
+                    indexes.append(self.filter_model.mapToSource(index))
+                    values.append(text)
+
+        self.table_model.set_values(indexes, values)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from to_do_app import ToDoFilterModel, ToDoModel, ToDoStore
+
+
+class ToDoStoreSnapshotTest(unittest.TestCase):
+    '''
+        Snapshots saved by older versions of the app, whole file is one json list of [text, status]
+    '''
+    def setUp(self):
+        self.dir_path = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir_path, 'to_do.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_path)
+
+    def write_old_snapshot(self, data):
+        with open(self.path, 'w') as fp:
+            json.dump(data, fp)
+
+    def test_empty_old_snapshot(self):
+        self.write_old_snapshot([])
+
+        store = ToDoStore(self.path)
+        store.read_snapshot()
+
+        self.assertEqual(store.get_items(), [])
+        self.assertEqual(store.version, 0)
+
+    def test_old_snapshot(self):
+        self.write_old_snapshot([['Buy milk', False], ['Write report', True]])
+
+        store = ToDoStore(self.path)
+        store.read_snapshot()
+
+        self.assertEqual([(text, status) for item_id, text, status in store.get_items()],
+                         [('Buy milk', False), ('Write report', True)])
+
+    def test_old_snapshot_is_rewritten_with_ids(self):
+        self.write_old_snapshot([['Buy milk', False], ['Write report', True]])
+
+        store = ToDoStore(self.path)
+        store.read_snapshot()
+        self.assertTrue(store.log_count) # compacted when store is closed
+        store.compact()
+
+        reloaded = ToDoStore(self.path)
+        reloaded.read_snapshot()
+        self.assertEqual(reloaded.get_items(), store.get_items())
+
+
+class ToDoFilterModelTest(unittest.TestCase):
+    '''
+        Proxy follows batch changes of source model, proxy order is compared with rows of source model
+    '''
+    def setUp(self):
+        self.model = ToDoModel()
+        self.proxy_model = ToDoFilterModel()
+        self.proxy_model.setSourceModel(self.model)
+
+    def get_order(self):
+        return [self.proxy_model.mapToSource(self.proxy_model.index(row)).row()
+                for row in range(self.proxy_model.rowCount())]
+
+    def test_complete_ranges_sorted_by_status(self):
+        for label in ('a', 'b', 'c', 'd'):
+            self.model.add(label)
+        self.proxy_model.set_sort(ToDoFilterModel.STATUS)
+
+        self.model.complete([(2, 2), (0, 0)])
+
+        self.assertEqual(self.get_order(), [1, 3, 0, 2])
+
+    def test_map_appended_row_hidden_by_filter(self):
+        self.model.add('a')
+        self.proxy_model.set_filter('b', ToDoFilterModel.DONE)
+        self.proxy_model.mapFromSource(self.model.index(0)) # view builds proxy_rows when it maps indexes
+
+        self.model.add('b') # not done, so it is not shown
+        self.assertFalse(self.proxy_model.mapFromSource(self.model.index(1)).isValid())
+
+        self.model.delete([(1, 1)])
+        self.assertEqual(self.get_order(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
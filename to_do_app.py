@@ -1,24 +1,456 @@
 from PySide2 import QtCore, QtWidgets, QtGui
+from collections import OrderedDict
+from itertools import compress
 import json
+import mmap
 import os.path
+import queue
+import sys
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
 
 ''' 
     Uses Model/View approach to show simple list of task with their status (Done/Not done) 
-    Persists data in to_do.json for loading, all changes are saved immediately 
+    Persists data in to_do.json for loading, all changes are appended to operation log in background
+    Several running instances could share the same files, changes of one are shown in others
 '''
 
 tick = QtGui.QImage('tick.png') # https://p.yusukekamiyamane.com/
 
+ADD = 'add'
+DELETE = 'delete'
+COMPLETE = 'complete'
+MOVE = 'move'
+
+def apply_operation(items, operation):
+    '''
+        Applies one logged operation, operations are keyed by item id so replaying them twice is harmless
+    :param items: OrderedDict of id -> [text, status]
+    :param operation: dictionary with 'op' and its arguments
+    :return: None
+    '''
+    kind = operation['op']
+    if kind == ADD:
+        if operation['id'] not in items:
+            items[operation['id']] = [operation['text'], False]
+    elif kind == DELETE:
+        for item_id in operation['ids']:
+            items.pop(item_id, None)
+    elif kind == COMPLETE:
+        for item_id in operation['ids']:
+            if item_id in items:
+                items[item_id][1] = True
+    elif kind == MOVE:
+        moved = [item_id for item_id in operation['ids'] if item_id in items]
+        if not moved:
+            return
+        moved_set = set(moved)
+        order = [item_id for item_id in items if item_id not in moved_set]
+        before = operation['before']
+        split = order.index(before) if before in items and before not in moved_set else len(order)
+        # items in front of split stay, moved block and rest are appended after them in order
+        for item_id in moved + order[split:]:
+            items.move_to_end(item_id)
+
+def read_lines(path, offset=0):
+    '''
+        Yields lines of file through memory map, OS pages file in instead of reading it into one big string
+    :param path: file to read
+    :param offset: bytes to skip
+    :return: generator of bytes
+    '''
+    if not os.path.exists(path) or os.path.getsize(path) <= offset:
+        return
+
+    with open(path, 'rb') as fp:
+        mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            mapped.seek(offset)
+            for line in iter(mapped.readline, b''):
+                yield line
+        finally:
+            mapped.close()
+
+def bisect_by_key(rows, key, value):
+    '''
+        Binary search in rows sorted by key
+    :param rows: list of rows in ascending order of key(row)
+    :param key: function returning sort key of row
+    :param value: sort key of row being inserted
+    :return: position which keeps rows sorted
+    '''
+    low, high = 0, len(rows)
+    while low < high:
+        middle = (low + high) // 2
+        if key(rows[middle]) < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def merge_ranges(ranges):
+    '''
+        Merges overlapping and adjacent ranges, so batch change is announced once per range instead of once per row
+    :param ranges: iterable of (first, last) rows, in any order
+    :return: list of (first, last) in ascending order
+    '''
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return [(first, last) for first, last in merged]
+
+class FileLock(object):
+    '''
+        Exclusive lock of lock file next to store, held by one instance (process or window) at a time
+        Used as context manager, waits until lock is released by other instance
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.fp = None
+
+    def __enter__(self):
+        self.fp = open(self.path, 'a+')
+        if fcntl:
+            fcntl.flock(self.fp.fileno(), fcntl.LOCK_EX)
+        else:
+            self.fp.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.fp.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError: # LK_LOCK gives up after 10 seconds
+                    continue
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if fcntl:
+            fcntl.flock(self.fp.fileno(), fcntl.LOCK_UN)
+        else:
+            self.fp.seek(0)
+            msvcrt.locking(self.fp.fileno(), msvcrt.LK_UNLCK, 1)
+        self.fp.close()
+        self.fp = None
+
+class ToDoStore(QtCore.QObject):
+    '''
+        Snapshot of all items is kept in json lines file, every change after it is appended to operation log
+        Operations are batched on GUI thread and written by background thread, so GUI never waits for disk
+        Log is compacted into snapshot after COMPACT_AFTER operations, snapshot is replaced atomically
+
+        Store could be shared by several running instances. Files are touched only under file lock, every logged
+        operation gets next version and operations of other instances are read before own ones are appended.
+        File watcher reads only operations appended since last read and passes them on as remote_operations.
+        Log order is the shared order of items, it is passed on as order_changed once own operations are written.
+    '''
+    LOG_SUFFIX = '.log'
+    LOCK_SUFFIX = '.lock'
+    COMPACT_AFTER = 1000 # logged operations
+    FLUSH_DELAY = 200 # ms without change before batch is handed to writer
+    SYNC_DELAY = 100 # ms, file watcher notifications are coalesced
+
+    remote_operations = QtCore.Signal(list) # operations written by other instances
+    reloaded = QtCore.Signal(list) # all (id, text, status), when missed operations were compacted already
+    order_changed = QtCore.Signal(list) # ids in log order, once all own operations are written
+    batches_written = QtCore.Signal(list, int) # emitted from writer thread, ids in log order and written batches
+
+    def __init__(self, path, parent=None):
+        super(ToDoStore, self).__init__(parent)
+
+        self.path = os.path.abspath(path)
+        base_path = os.path.splitext(self.path)[0]
+        self.log_path = base_path + self.LOG_SUFFIX
+        self.lock_path = base_path + self.LOCK_SUFFIX
+
+        # replica of model, owned by writer thread after load
+        self.items = OrderedDict()
+        self.version = 0 # version of last operation applied to items
+        self.snapshot_version = 0 # version snapshot was compacted at
+        self.log_offset = 0 # bytes of log applied to items
+        self.log_count = 0
+
+        self.pending = []
+        self.unwritten_batches = 0 # handed to writer thread, not written yet
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self.run, name='ToDoStoreWriter')
+        self.writer.daemon = True
+
+        self.flush_timer = QtCore.QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.FLUSH_DELAY)
+        self.flush_timer.timeout.connect(self.flush)
+
+        self.sync_timer = QtCore.QTimer(self)
+        self.sync_timer.setSingleShot(True)
+        self.sync_timer.setInterval(self.SYNC_DELAY)
+        self.sync_timer.timeout.connect(self.request_sync)
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_file_changed)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+
+        self.batches_written.connect(self.on_batches_written)
+
+    def exists(self):
+        return os.path.exists(self.path) or os.path.exists(self.log_path)
+
+    def load(self, first_run_texts=()):
+        '''
+            Reads snapshot and replays operation log on top of it, then starts writer and file watcher
+            First run is detected under file lock, so only one of instances started together adds first items
+        :param first_run_texts: labels of items added when store does not exist yet
+        :return: list of (id, text, status)
+        '''
+        with FileLock(self.lock_path):
+            is_new = not self.exists()
+            self.read_snapshot()
+            self.read_log()
+            if is_new and first_run_texts:
+                self.write_log([{'op': ADD, 'id': uuid.uuid4().hex, 'text': text} for text in first_run_texts])
+
+        data = self.get_items()
+        self.watcher.addPath(os.path.dirname(self.path)) # log is created and removed, directory tells about it
+        self.on_file_changed(self.log_path)
+        self.writer.start()
+        return data
+
+    def get_items(self):
+        return [(item_id, text, status) for item_id, (text, status) in self.items.items()]
+
+    def append(self, operation):
+        ''' O(1) on GUI thread, operation waits for batch which is flushed once changes settle '''
+        self.pending.append(operation)
+        self.flush_timer.start()
+
+    def flush(self):
+        ''' Hands pending operations to writer thread '''
+        self.flush_timer.stop()
+        if self.pending:
+            self.queue.put(self.pending)
+            self.pending = []
+            self.unwritten_batches += 1
+
+    def request_sync(self):
+        ''' Empty batch only reads operations of other instances '''
+        self.queue.put([])
+
+    def on_batches_written(self, order, count):
+        '''
+            Instances append their own items locally before they know versions of operations of others
+            Once no own operation waits for writing, log order is passed on, so all instances show the same order
+        '''
+        self.unwritten_batches -= count
+        if not self.unwritten_batches and not self.pending:
+            self.order_changed.emit(order)
+
+    def on_file_changed(self, path):
+        ''' Log is watched again when it was created after compaction, changes are read once they settle '''
+        if os.path.exists(self.log_path) and self.log_path not in self.watcher.files():
+            self.watcher.addPath(self.log_path)
+        self.sync_timer.start()
+
+    def close(self):
+        ''' Writes everything pending and waits for writer to finish '''
+        self.flush()
+        self.watcher.removePaths(self.watcher.files() + self.watcher.directories())
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+
+    def run(self):
+        ''' Writer thread, batches waiting in queue are written together with one fsync '''
+        running = True
+        while running:
+            operations = []
+            batch_count = 0
+            batch = self.queue.get()
+            while batch is not None:
+                operations.extend(batch)
+                batch_count += 1 if batch else 0 # empty batch only requests sync
+                try:
+                    batch = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            running = batch is not None
+
+            with FileLock(self.lock_path):
+                remote = self.sync()
+                if operations:
+                    self.write_log(operations)
+                if self.log_count >= self.COMPACT_AFTER or (not running and self.log_count):
+                    self.compact()
+
+            if remote is None:
+                self.reloaded.emit(self.get_items())
+            elif remote:
+                self.remote_operations.emit(remote)
+            if remote is None or remote or batch_count:
+                self.batches_written.emit(list(self.items), batch_count)
+
+    def sync(self):
+        '''
+            Applies operations of other instances to replica, lock has to be held
+        :return: list of new operations, None when replica had to be loaded again
+        '''
+        snapshot_version = self.read_snapshot_version()
+        if snapshot_version != self.snapshot_version: # log was compacted by other instance
+            if snapshot_version > self.version: # some operations were compacted before this instance read them
+                self.read_snapshot()
+                self.read_log()
+                return None
+            self.snapshot_version = snapshot_version
+            self.log_offset = 0
+            self.log_count = 0
+        return self.read_log()
+
+    def read_snapshot_version(self):
+        ''' Snapshot starts with header line holding version, only that line is read '''
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as fp:
+            line = fp.readline()
+        try:
+            header = json.loads(line)
+        except ValueError:
+            return 0
+        return header.get('version', 0) if isinstance(header, dict) else 0
+
+    def read_snapshot(self):
+        '''
+            Versioned snapshot starts with header line followed by one [id, text, status] per line
+            Any other file is old format - one json list of [text, status] without ids, including empty []
+        '''
+        self.items = OrderedDict()
+        self.version = self.snapshot_version = 0
+        self.log_offset = self.log_count = 0
+
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as fp:
+            header_line = fp.readline()
+        try:
+            header = json.loads(header_line)
+        except ValueError: # old format written with indentation
+            header = None
+
+        if not isinstance(header, dict):
+            self.read_old_snapshot()
+            return
+
+        self.version = self.snapshot_version = header['version']
+        for line in read_lines(self.path, len(header_line)):
+            item_id, text, status = json.loads(line)
+            self.items[item_id] = [text, status]
+
+    def read_old_snapshot(self):
+        ''' Items get new ids, file is rewritten in new format on next compaction '''
+        with open(self.path, 'rb') as fp:
+            data = fp.read()
+
+        entries = json.loads(data) if data.strip() else []
+        if not isinstance(entries, list):
+            raise ValueError('Unknown format of {}'.format(self.path))
+
+        for text, status in entries:
+            self.items[uuid.uuid4().hex] = [text, status]
+        self.log_count += 1
+
+    def read_log(self):
+        '''
+            Applies operations appended to log since last read, operations already in snapshot are skipped
+        :return: list of applied operations
+        '''
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) < self.log_offset: # log was replaced
+            self.log_offset = 0
+
+        operations = []
+        for line in read_lines(self.log_path, self.log_offset):
+            if not line.endswith(b'\n'): # torn last line, it was never confirmed as saved
+                break
+            self.log_offset += len(line)
+            self.log_count += 1
+            try:
+                operation = json.loads(line)
+            except ValueError: # torn line which was followed by other writes
+                continue
+
+            version = operation.get('version') # operations logged before versioning have none
+            if version is not None:
+                if version <= self.version:
+                    continue
+                self.version = version
+            apply_operation(self.items, operation)
+            operations.append(operation)
+        return operations
+
+    def write_log(self, operations):
+        ''' Appends operations with next versions, lock has to be held and replica synced '''
+        lines = []
+        for operation in operations:
+            self.version += 1
+            lines.append(json.dumps(dict(operation, version=self.version)) + '\n')
+            apply_operation(self.items, operation)
+        data = ''.join(lines).encode('utf-8')
+
+        with open(self.log_path, 'a+b') as log_file:
+            size = log_file.seek(0, os.SEEK_END)
+            if size:
+                log_file.seek(size - 1)
+                if log_file.read(1) != b'\n': # torn line of crashed writer is closed, readers skip it
+                    data = b'\n' + data
+            log_file.write(data)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+        self.log_offset = size + len(data)
+        self.log_count += len(operations)
+
+    def compact(self):
+        '''
+            Writes all items to temporary file and renames it over snapshot, then log is dropped
+            Crash before rename keeps old snapshot and log, crash after rename only replays log again
+        '''
+        temp_path = self.path + '.new'
+        with open(temp_path, 'w') as fp:
+            fp.write(json.dumps({'version': self.version}) + '\n')
+            fp.writelines(json.dumps([item_id, text, status]) + '\n' for item_id, (text, status) in self.items.items())
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temp_path, self.path)
+
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.snapshot_version = self.version
+        self.log_offset = 0
+        self.log_count = 0
+
 class ToDoModel(QtCore.QAbstractListModel ):
+    '''
+        Items are kept column by column - interned labels, one status byte per item and stable ids
+        Bulk operations take ranges of rows and touch each column once
+    '''
+    RESET_AFTER_RANGES = 64 # more ranges are removed by one compaction and model reset
 
     def __init__(self):
         super(ToDoModel, self).__init__()
 
-        self._data = [('Test Item1', False), ('Test Item2', False)] #  test data - label and status
+        self._texts = [] # labels, equal labels share one string object
+        self._keys = [] # lowercase labels, searched and sorted by filter model
+        self._done = bytearray() # status, 1 for done
+        self._ids = [] # stable id of item, persisted operations refer to items by it
 
     def rowCount(self, index):
         ''' Implemented function - to count items'''
-        return len(self._data)
+        return len(self._texts)
 
     def data(self, index, role):
         '''
@@ -28,63 +460,490 @@ class ToDoModel(QtCore.QAbstractListModel ):
             :param role - should return only for QtCore.Qt.DisplayRole
         '''
         if role == QtCore.Qt.DisplayRole:
-            text, status = self._data[index.row()]
-            return text
+            return self._texts[index.row()]
 
         if role == QtCore.Qt.DecorationRole:
-            _, status = self._data[index.row()]
-            if status:
+            if self._done[index.row()]:
                 return tick
 
-    def add(self, label):
+    def add(self, label, item_id=None):
         '''
             Add to do item with 'label' text
         :param label:
-        :return: None
+        :param item_id: id of item added by other instance, new id is created when None
+        :return: id of new item
         '''
         if label:
-            self._data.append((label, False))
-            self.layoutChanged.emit()
+            item_id = item_id or uuid.uuid4().hex
+            row = len(self._texts)
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self._texts.append(sys.intern(label))
+            self._keys.append(sys.intern(label.lower()))
+            self._done.append(0)
+            self._ids.append(item_id)
+            self.endInsertRows()
+            return item_id
 
-    def delete(self, selection):
+    def delete(self, ranges):
         '''
-            Deletes selected to do item
-        :param selection: position/coordinates which item view requests, values could be pulled by row() or column()
+            Deletes selected to do items
+        :param ranges: list of (first, last) rows
         :return: None
         '''
-        for select in selection:
-            self._data.pop(select.row())
+        ranges = merge_ranges(ranges)
+        if len(ranges) > self.RESET_AFTER_RANGES:
+            # one pass over every column instead of shifting tail of lists once per range
+            keep = self._get_mask(ranges, selected=False)
+            self.beginResetModel()
+            self._texts = list(compress(self._texts, keep))
+            self._keys = list(compress(self._keys, keep))
+            self._done = bytearray(compress(self._done, keep))
+            self._ids = list(compress(self._ids, keep))
+            self.endResetModel()
+            return
 
-        self.layoutChanged.emit()
+        # from the bottom up, so rows of ranges not removed yet do not shift
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            del self._texts[first:last + 1]
+            del self._keys[first:last + 1]
+            del self._done[first:last + 1]
+            del self._ids[first:last + 1]
+            self.endRemoveRows()
 
-    def complete(self, selection):
+    def complete(self, ranges):
         '''
-            Completes selected to do item
-        :param selection: position/coordinates which item view requests, values could be pulled by row() or column()
+            Completes selected to do items
+        :param ranges: list of (first, last) rows
         :return: None
         '''
-        for select in selection:
-            text, status = self._data[select.row()]
+        ranges = merge_ranges(ranges)
+        for first, last in ranges:
+            self._done[first:last + 1] = b'\x01' * (last - first + 1)
 
-            self._data[select.row()] = (text, True)
+        if len(ranges) > self.RESET_AFTER_RANGES: # scattered rows, one signal spanning all of them is cheaper
+            ranges = [(ranges[0][0], ranges[-1][1])]
+        for first, last in ranges:
+            self.dataChanged.emit(self.index(first), self.index(last), [QtCore.Qt.DecorationRole])
 
-        self.dataChanged.emit(select.row(), select.row()) # needs to have top-left, bottom-right values
+    def move(self, ranges, destination):
+        '''
+            Moves selected items as one block in front of row 'destination', order of other items is kept
+        :param ranges: list of (first, last) rows
+        :param destination: row in current order, row count moves items to the end
+        :return: id of item the block was moved in front of, None for end
+        '''
+        selected = self._get_mask(ranges, selected=True)
+        rows = range(len(self._texts))
+        kept = [row for row in rows if not selected[row]]
+        split = sum(1 for row in kept if row < destination)
+        order = kept[:split] + list(compress(rows, selected)) + kept[split:]
+        before = self._ids[kept[split]] if split < len(kept) else None
+        self._reorder(order)
+        return before
 
-    def set_data(self, json_data):
+    def set_order(self, ids):
         '''
-            Sets data from saved file
-        :param json_data: previously saved data
+            Reorders items to order of ids, eg. log order shared by all instances
+        :param ids: ids of all items
         :return: None
         '''
-        self._data = json_data
+        if ids == self._ids:
+            return
+        rows = dict((item_id, row) for row, item_id in enumerate(self._ids))
+        if len(ids) != len(rows) or any(item_id not in rows for item_id in ids):
+            return # items differ, next sync brings the missing operations
+        self._reorder([rows[item_id] for item_id in ids])
+
+    def _reorder(self, order):
+        ''' Moves rows to new positions, order lists old rows in their new order '''
+        self.layoutAboutToBeChanged.emit()
+        self._texts = [self._texts[row] for row in order]
+        self._keys = [self._keys[row] for row in order]
+        self._done = bytearray(map(self._done.__getitem__, order))
+        self._ids = [self._ids[row] for row in order]
+
+        new_rows = [0] * len(order)
+        for new_row, row in enumerate(order):
+            new_rows[row] = new_row
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(old_indexes, [self.index(new_rows[index.row()]) for index in old_indexes])
         self.layoutChanged.emit()
 
+    def _get_mask(self, ranges, selected):
+        ''' Byte per row, 1 for rows inside ranges when 'selected', inverted otherwise '''
+        inside, outside = (b'\x01', b'\x00') if selected else (b'\x00', b'\x01')
+        mask = bytearray(outside * len(self._texts))
+        for first, last in ranges:
+            mask[first:last + 1] = inside * (last - first + 1)
+        return mask
+
+    def set_data(self, items):
+        '''
+            Sets data from saved file
+        :param items: list of previously saved (id, text, status)
+        :return: None
+        '''
+        self.beginResetModel()
+        self._ids = [item_id for item_id, _, _ in items]
+        self._texts = [sys.intern(text) for _, text, _ in items]
+        self._keys = [sys.intern(text.lower()) for text in self._texts]
+        self._done = bytearray(bool(status) for _, _, status in items)
+        self.endResetModel()
+
+    def get_rows(self, ids):
+        '''
+            Returns rows of items with given ids, missing ids are skipped
+        :param ids: list of str
+        :return: list of int in ascending order
+        '''
+        ids = set(ids)
+        return [row for row, item_id in enumerate(self._ids) if item_id in ids]
+
+    def apply_operations(self, operations):
+        '''
+            Applies operations logged by other instance, only rows they touch are changed
+        :param operations: list of dictionaries with 'op' and its arguments
+        :return: None
+        '''
+        existing = set(self._ids)
+        for operation in operations:
+            kind = operation['op']
+            if kind == ADD:
+                if operation['id'] not in existing:
+                    existing.add(self.add(operation['text'], operation['id']))
+                continue
+
+            ranges = [(row, row) for row in self.get_rows(operation['ids'])]
+            if not ranges:
+                continue
+            if kind == DELETE:
+                existing.difference_update(operation['ids'])
+                self.delete(ranges)
+            elif kind == COMPLETE:
+                self.complete(ranges)
+            elif kind == MOVE:
+                before = self.get_rows([operation['before']])
+                self.move(ranges, before[0] if before else len(self._ids))
+
+    def get_ids(self, ranges):
+        '''
+            Returns ids of selected items
+        :param ranges: list of (first, last) rows
+        :return: list of str
+        '''
+        return [item_id for first, last in merge_ranges(ranges) for item_id in self._ids[first:last + 1]]
+
     def get_data(self):
         '''
             Returns data for persisting
-        :return: string
+        :return: list of (id, text, status)
+        '''
+        return [(item_id, text, bool(status)) for item_id, text, status in zip(self._ids, self._texts, self._done)]
+
+class ToDoFilterModel(QtCore.QAbstractProxyModel):
+    '''
+        Filtered and sorted view of ToDoModel, labels and statuses are read from source columns, nothing is copied
+        Proxy index is list of source rows, sorted index over all rows is kept up to date as rows are added and removed
+        Narrowing search (new text contains previous one) scans only rows which are visible already
+    '''
+    ALL = 'All'
+    NOT_DONE = 'Not done'
+    DONE = 'Done'
+    STATUSES = [ALL, NOT_DONE, DONE]
+
+    MANUAL = 'Manual order'
+    LABEL = 'Label'
+    STATUS = 'Status'
+    SORTS = [MANUAL, LABEL, STATUS]
+
+    RESET_AFTER_RANGES = 64 # bigger changes reset proxy instead of signalling each range
+
+    def __init__(self, parent=None):
+        super(ToDoFilterModel, self).__init__(parent)
+
+        self.order = [] # proxy row -> source row
+        self.proxy_rows = None # source row -> proxy row, -1 if filtered out, built when needed
+        self.sorted_rows = None # all source rows in sort order, None for manual order
+        self.sorted_statuses = None # statuses sorted_rows were sorted by, only when sorted by status
+        self.saved_indexes = [] # persistent indexes with their source, kept over source layout change
+
+        self.text = ''
+        self.status = self.ALL
+        self.sort_by = self.MANUAL
+
+    def setSourceModel(self, model):
+        super(ToDoFilterModel, self).setSourceModel(model)
+
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self.on_source_reset)
+        model.rowsInserted.connect(self.on_source_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self.on_source_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self.on_source_rows_removed)
+        model.dataChanged.connect(self.on_source_data_changed)
+        model.layoutAboutToBeChanged.connect(self.on_source_layout_about_to_be_changed)
+        model.layoutChanged.connect(self.on_source_layout_changed)
+
+        self.beginResetModel()
+        self.on_source_reset()
+
+    def index(self, row, column=0, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not 0 <= row < len(self.order) or column != 0:
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None: # QObject.parent()
+            return QtCore.QObject.parent(self)
+        return QtCore.QModelIndex()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.order)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QtCore.QModelIndex()
+        return self.sourceModel().index(self.order[proxy_index.row()])
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QtCore.QModelIndex()
+        row = self.get_proxy_rows()[source_index.row()]
+        if row < 0:
+            return QtCore.QModelIndex()
+        return self.index(row)
+
+    def get_proxy_rows(self):
+        if self.proxy_rows is None:
+            self.proxy_rows = [-1] * self.sourceModel().rowCount(QtCore.QModelIndex())
+            for proxy_row, row in enumerate(self.order):
+                self.proxy_rows[row] = proxy_row
+        return self.proxy_rows
+
+    def get_source_rows(self, first_row, last_row):
+        ''' Source rows of proxy rows first_row..last_row (inclusive) '''
+        return self.order[first_row:last_row + 1]
+
+    def get_source_ranges(self, first_row, last_row):
+        '''
+            Source rows of proxy rows first_row..last_row (inclusive) as contiguous (first, last) runs
+            Unfiltered manual order maps rows one to one, so range is returned as it is without visiting its rows
+        '''
+        if self.is_manual_order() and len(self.order) == self.sourceModel().rowCount(QtCore.QModelIndex()):
+            return [(first_row, last_row)]
+
+        runs = []
+        for row in self.get_source_rows(first_row, last_row):
+            if runs and runs[-1][1] == row - 1:
+                runs[-1][1] = row
+            else:
+                runs.append([row, row])
+        return [(first, last) for first, last in runs]
+
+    def is_manual_order(self):
+        return self.sort_by == self.MANUAL
+
+    def set_filter(self, text, status):
+        '''
+            Shows only items containing text (case insensitive) with given status
+        :param text: searched text, empty shows all items
+        :param status: one of STATUSES
+        :return: None
+        '''
+        text = text.lower()
+        narrowing = status == self.status and self.text in text
+
+        self.beginResetModel()
+        self.text = text
+        self.status = status
+        self.update_order(self.order if narrowing else None)
+        self.endResetModel()
+
+    def set_sort(self, sort_by):
+        '''
+            Orders items by one of SORTS, equal items keep manual order
+        :return: None
         '''
-        return self._data
+        self.beginResetModel()
+        self.sort_by = sort_by
+        self.update_sorted_rows()
+        self.update_order()
+        self.endResetModel()
+
+    def get_sort_key(self):
+        ''' Function returning sort key of source row, row itself breaks ties so sort is stable '''
+        model = self.sourceModel()
+        if self.sort_by == self.LABEL:
+            return lambda row: (model._keys[row], row)
+        if self.sort_by == self.STATUS:
+            return lambda row: (model._done[row], row)
+        return lambda row: row
+
+    def update_sorted_rows(self):
+        model = self.sourceModel()
+        rows = range(model.rowCount(QtCore.QModelIndex()))
+        self.sorted_statuses = bytearray(model._done) if self.sort_by == self.STATUS else None
+        if self.sort_by == self.LABEL:
+            self.sorted_rows = sorted(rows, key=model._keys.__getitem__)
+        elif self.sort_by == self.STATUS:
+            self.sorted_rows = sorted(rows, key=model._done.__getitem__)
+        else:
+            self.sorted_rows = None
+
+    def filter_rows(self, rows):
+        ''' Rows passing filter, order of rows is kept '''
+        model = self.sourceModel()
+        if self.text:
+            keys = model._keys
+            text = self.text
+            rows = [row for row in rows if text in keys[row]]
+        if self.status != self.ALL:
+            done = model._done
+            wanted = 1 if self.status == self.DONE else 0
+            rows = [row for row in rows if done[row] == wanted]
+        return list(rows)
+
+    def update_order(self, candidates=None):
+        '''
+            Recomputes proxy index from filter and sorted index
+        :param candidates: rows in sort order which could pass filter, all rows when None
+        :return: None
+        '''
+        if candidates is None:
+            candidates = self.sorted_rows
+            if candidates is None:
+                candidates = range(self.sourceModel().rowCount(QtCore.QModelIndex()))
+
+        self.order = self.filter_rows(candidates)
+        self.proxy_rows = None
+
+    def insert_rows(self, rows):
+        ''' Adds source rows which pass filter at their sorted position, one insert signal per row '''
+        key = self.get_sort_key()
+        rows = self.filter_rows(rows)
+        if len(rows) > self.RESET_AFTER_RANGES:
+            self.beginResetModel()
+            self.order = sorted(self.order + rows, key=key)
+            self.proxy_rows = None
+            self.endResetModel()
+            return
+
+        for row in rows:
+            position = bisect_by_key(self.order, key, key(row))
+            self.beginInsertRows(QtCore.QModelIndex(), position, position)
+            self.order.insert(position, row)
+            self.proxy_rows = None
+            self.endInsertRows()
+
+    def remove_rows(self, rows):
+        ''' Removes source rows from proxy, from the bottom up '''
+        proxy_rows = self.get_proxy_rows()
+        removed = merge_ranges((proxy_rows[row], proxy_rows[row]) for row in rows if proxy_rows[row] >= 0)
+        if len(removed) > self.RESET_AFTER_RANGES:
+            rows = set(rows)
+            self.beginResetModel()
+            self.order = [row for row in self.order if row not in rows]
+            self.proxy_rows = None
+            self.endResetModel()
+            return
+
+        for first, last in reversed(removed):
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            del self.order[first:last + 1]
+            self.proxy_rows = None
+            self.endRemoveRows()
+
+    def on_source_reset(self):
+        ''' Source rows changed, sorted index and filter are built again '''
+        self.update_sorted_rows()
+        self.update_order()
+        self.endResetModel()
+
+    def on_source_rows_inserted(self, parent, first, last):
+        ''' Rows after inserted ones are shifted, sorted index gets new rows by binary search '''
+        count = last - first + 1
+        if first < self.sourceModel().rowCount(QtCore.QModelIndex()) - count: # not appended
+            self.order = [row + count if row >= first else row for row in self.order]
+            if self.sorted_rows is not None:
+                self.sorted_rows = [row + count if row >= first else row for row in self.sorted_rows]
+        self.proxy_rows = None # new rows are missing in it even when they do not pass filter
+        if self.sorted_statuses is not None:
+            self.sorted_statuses[first:first] = self.sourceModel()._done[first:last + 1]
+
+        rows = range(first, last + 1)
+        if self.sorted_rows is not None:
+            key = self.get_sort_key()
+            for row in rows:
+                self.sorted_rows.insert(bisect_by_key(self.sorted_rows, key, key(row)), row)
+        self.insert_rows(rows)
+
+    def on_source_rows_about_to_be_removed(self, parent, first, last):
+        ''' Rows are removed from proxy while source still has them, so proxy can be queried in between '''
+        self.remove_rows(range(first, last + 1))
+
+    def on_source_rows_removed(self, parent, first, last):
+        count = last - first + 1
+        self.order = [row - count if row > last else row for row in self.order]
+        if self.sorted_rows is not None:
+            self.sorted_rows = [row - count if row > last else row for row in self.sorted_rows if not first <= row <= last]
+        if self.sorted_statuses is not None:
+            del self.sorted_statuses[first:last + 1]
+        self.proxy_rows = None
+
+    def on_source_data_changed(self, top_left, bottom_right, roles=[]):
+        ''' Status changes hide or move rows only when status is filtered or sorted, otherwise they are forwarded '''
+        rows = range(top_left.row(), bottom_right.row() + 1)
+        if self.sort_by == self.STATUS:
+            # model could change statuses of several ranges before first of them is signalled, all rows changed
+            # since last sort are moved at once, so rows left in order keep keys they were sorted by
+            rows = self.get_status_changed_rows()
+            if rows:
+                self.remove_rows(rows)
+                self.update_sorted_rows()
+                self.insert_rows(rows)
+            return
+
+        if self.status != self.ALL:
+            self.remove_rows(rows)
+            self.insert_rows(rows)
+            return
+
+        proxy_rows = self.get_proxy_rows()
+        changed = merge_ranges((proxy_rows[row], proxy_rows[row]) for row in rows if proxy_rows[row] >= 0)
+        if len(changed) > self.RESET_AFTER_RANGES:
+            changed = [(changed[0][0], changed[-1][1])]
+        for first, last in changed:
+            self.dataChanged.emit(self.index(first), self.index(last), roles)
+
+    def get_status_changed_rows(self):
+        ''' Source rows whose status differs from the one they were sorted by '''
+        statuses = self.sourceModel()._done
+        if statuses == self.sorted_statuses:
+            return []
+        return [row for row, (old, new) in enumerate(zip(self.sorted_statuses, statuses)) if old != new]
+
+    def on_source_layout_about_to_be_changed(self):
+        ''' Source rows are reordered, persistent indexes remember their source index to be found again '''
+        self.layoutAboutToBeChanged.emit()
+        self.saved_indexes = [(index, QtCore.QPersistentModelIndex(self.mapToSource(index)))
+                              for index in self.persistentIndexList()]
+
+    def on_source_layout_changed(self):
+        self.update_sorted_rows()
+        self.update_order()
+
+        model = self.sourceModel()
+        old_indexes = [index for index, _ in self.saved_indexes]
+        new_indexes = [self.mapFromSource(model.index(source.row())) if source.isValid() else QtCore.QModelIndex()
+                       for _, source in self.saved_indexes]
+        self.saved_indexes = []
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
 
 class MainWindow(QtWidgets.QMainWindow):
     SAVE_FILE_NAME = 'to_do.json'
@@ -93,6 +952,12 @@ class MainWindow(QtWidgets.QMainWindow):
         super(MainWindow, self).__init__()
 
         self.model = ToDoModel()
+        self.proxy_model = ToDoFilterModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.store = ToDoStore(self.SAVE_FILE_NAME, self)
+        self.store.remote_operations.connect(self.model.apply_operations)
+        self.store.reloaded.connect(self.on_store_reloaded)
+        self.store.order_changed.connect(self.model.set_order)
 
         self.setWindowTitle('To Do App')
 
@@ -103,13 +968,27 @@ class MainWindow(QtWidgets.QMainWindow):
         self.load()
 
     def create_widgets(self):
+        self.filter_edit = QtWidgets.QLineEdit()
+        self.filter_edit.setPlaceholderText("Search")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.status_combo = QtWidgets.QComboBox()
+        self.status_combo.addItems(ToDoFilterModel.STATUSES)
+        self.sort_combo = QtWidgets.QComboBox()
+        self.sort_combo.addItems(ToDoFilterModel.SORTS)
+
         self.list_view = QtWidgets.QListView()
-        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True) # rows are not measured one by one
+        self.list_view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection) # bulk delete, complete and move
+        self.list_view.setModel(self.proxy_model)
         self.delete_btn = QtWidgets.QPushButton("Delete")
         self.delete_btn.setEnabled(False)
         self.complete_btn = QtWidgets.QPushButton("Complete")
         self.complete_btn.setEnabled(False)
         self.line_edit = QtWidgets.QLineEdit()
+        self.move_up_btn = QtWidgets.QPushButton("Move Up")
+        self.move_up_btn.setEnabled(False)
+        self.move_down_btn = QtWidgets.QPushButton("Move Down")
+        self.move_down_btn.setEnabled(False)
         self.add_btn = QtWidgets.QPushButton("Add To Do")
         self.add_btn.setEnabled(False)
 
@@ -117,12 +996,21 @@ class MainWindow(QtWidgets.QMainWindow):
         central_widget = QtWidgets.QWidget()
 
         outer_layout = QtWidgets.QVBoxLayout()
+
+        filter_layout = QtWidgets.QHBoxLayout()
+        filter_layout.addWidget(self.filter_edit)
+        filter_layout.addWidget(self.status_combo)
+        filter_layout.addWidget(self.sort_combo)
+
+        outer_layout.addLayout(filter_layout)
         outer_layout.addWidget(self.list_view)
 
         # wrapper for edit buttons
         edit_button_layout = QtWidgets.QHBoxLayout()
         edit_button_layout.addWidget(self.delete_btn)
         edit_button_layout.addWidget(self.complete_btn)
+        edit_button_layout.addWidget(self.move_up_btn)
+        edit_button_layout.addWidget(self.move_down_btn)
 
         outer_layout.addLayout(edit_button_layout)
         outer_layout.addWidget(self.line_edit)
@@ -137,6 +1025,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self.add_btn.clicked.connect(self.add)
         self.delete_btn.clicked.connect(self.delete)
         self.complete_btn.clicked.connect(self.complete)
+        self.move_up_btn.clicked.connect(self.move_up)
+        self.move_down_btn.clicked.connect(self.move_down)
+
+        self.filter_edit.textChanged.connect(self.update_filter)
+        self.status_combo.currentIndexChanged.connect(self.update_filter)
+        self.sort_combo.currentIndexChanged.connect(self.update_sort)
 
         self.line_edit.textChanged.connect(self.update_buttons)
         self.list_view.selectionModel().selectionChanged.connect(self.update_buttons)
@@ -147,48 +1041,98 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.line_edit.text():
             self.add_btn.setEnabled(True)
 
-        self.delete_btn.setEnabled(True)
-        self.complete_btn.setEnabled(True)
-        if not self.list_view.selectedIndexes():
-            self.delete_btn.setEnabled(False)
-            self.complete_btn.setEnabled(False)
+        has_selection = self.list_view.selectionModel().hasSelection()
+        for button in (self.delete_btn, self.complete_btn):
+            button.setEnabled(has_selection)
+
+        # moving is done in manual order, it would not be visible in sorted view
+        for button in (self.move_up_btn, self.move_down_btn):
+            button.setEnabled(has_selection and self.proxy_model.is_manual_order())
+
+    def update_filter(self):
+        ''' Filters list by search text and status '''
+        self.proxy_model.set_filter(self.filter_edit.text(), self.status_combo.currentText())
+        self.update_buttons()
+
+    def update_sort(self):
+        self.proxy_model.set_sort(self.sort_combo.currentText())
+        self.update_buttons()
+
+    def get_selected_ranges(self):
+        ''' Selection as (first, last) rows of source model, each selection range is mapped as whole '''
+        return merge_ranges(source_range
+                            for selection_range in self.list_view.selectionModel().selection()
+                            for source_range in self.proxy_model.get_source_ranges(selection_range.top(), selection_range.bottom()))
+
+    def get_selected_proxy_rows(self):
+        ''' First and last selected row as shown in the view '''
+        selection = self.list_view.selectionModel().selection()
+        return (min(selection_range.top() for selection_range in selection),
+                max(selection_range.bottom() for selection_range in selection))
 
     def add(self):
         ''' After clicked button, adds item to model via its method '''
         if self.line_edit.text():
-            self.model.add(self.line_edit.text())
+            text = self.line_edit.text()
+            item_id = self.model.add(text)
+            self.store.append({'op': ADD, 'id': item_id, 'text': text})
             self.line_edit.setText('')
             self.update_buttons()
-            self.save()
 
     def delete(self):
         ''' After delete button is clicke '''
-        selection = self.list_view.selectedIndexes()
-        if selection:
-            self.model.delete(selection)
+        ranges = self.get_selected_ranges()
+        if ranges:
+            self.store.append({'op': DELETE, 'ids': self.model.get_ids(ranges)})
+            self.model.delete(ranges)
             self.list_view.clearSelection()
             self.update_buttons()
-            self.save()
 
     def complete(self):
         ''' After Complete button is pressed, completes item(s) '''
-        selection = self.list_view.selectedIndexes()
-        if selection:
-            self.model.complete(selection)
+        ranges = self.get_selected_ranges()
+        if ranges:
+            self.store.append({'op': COMPLETE, 'ids': self.model.get_ids(ranges)})
+            self.model.complete(ranges)
             self.list_view.clearSelection()
             self.update_buttons()
-            self.save()
+
+    def move_up(self):
+        ''' Moves selected items above visible item in front of first of them, hidden items are skipped '''
+        ranges = self.get_selected_ranges()
+        if not ranges:
+            return
+        first_row = self.get_selected_proxy_rows()[0]
+        if first_row > 0:
+            self.move(ranges, self.proxy_model.get_source_rows(first_row - 1, first_row - 1)[0])
+
+    def move_down(self):
+        ''' Moves selected items below visible item after last of them, hidden items are skipped '''
+        ranges = self.get_selected_ranges()
+        if not ranges:
+            return
+        last_row = self.get_selected_proxy_rows()[1]
+        if last_row + 1 < self.proxy_model.rowCount():
+            self.move(ranges, self.proxy_model.get_source_rows(last_row + 1, last_row + 1)[0] + 1)
+
+    def move(self, ranges, destination):
+        ids = self.model.get_ids(ranges)
+        before = self.model.move(ranges, destination)
+        self.store.append({'op': MOVE, 'ids': ids, 'before': before})
 
     def load(self):
-        ''' Loads persisted data, if exists '''
-        if os.path.exists(self.SAVE_FILE_NAME):
-            with open(self.SAVE_FILE_NAME, 'r') as fp:
-                self.model.set_data(json.load(fp))
-
-    def save(self):
-        ''' Persists current state of model into json file '''
-        with open(self.SAVE_FILE_NAME, 'w') as fp:
-            data = json.dump(self.model.get_data(), fp)
+        ''' Loads persisted data, test data are added on first run '''
+        self.model.set_data(self.store.load(first_run_texts=('Test Item1', 'Test Item2')))
+
+    def on_store_reloaded(self, items):
+        ''' Other instance compacted changes this one had not seen yet, own changes not written yet are kept '''
+        self.model.set_data(items)
+        self.model.apply_operations(self.store.pending)
+
+    def closeEvent(self, event):
+        ''' Pending changes are written before window closes '''
+        self.store.close()
+        super(MainWindow, self).closeEvent(event)
 
 
 